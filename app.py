@@ -4,132 +4,150 @@ os.environ['SERPAPI_API_KEY'] = 'e8e87504a12a592d143c4280e8ac79c15f4ee36f22e3dee
 
 from flask import Flask, request, jsonify
 from service_factory import ServiceFactory
+import http_client
+from response_cache import response_cache
 # from common_service.translation_service import TranslationService
-from gold_format_service import GoldPriceService
-from calendar_service import CalendarService
-from selenium.webdriver.support.ui import Select
-from selenium.webdriver.common.by import By
 
 app = Flask(__name__)
 
+# Registry dùng chung cho cả process, service chỉ được import/khởi tạo khi dùng lần đầu
+factory = ServiceFactory()
+# Khởi tạo trước các service hay dùng, vd: WARM_UP_SERVICES=gold_price_service,lottery_service
+factory.warm_up(os.getenv("WARM_UP_SERVICES", "").split(","), app.logger)
+
 def handle_request(service, request):
     """Handle request for services"""
     app.logger.debug("\n\nInput: %s", request.json)
-    response = service.process(json_data=request.json, log=app.logger)
+    response = response_cache.process(request.path, service, request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response), response.get("status", 200)
 
 @app.route("/search/movie", methods=["POST"])
 def movie():
     app.logger.debug("\n\nInput: %s", request.json)
-    response = ServiceFactory().get_movie_service().process(
-        json_data=request.json,
-        log=app.logger
-    )
+    response = response_cache.process(request.path, factory.get_movie_service(), request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response)
 
 @app.route("/search/weatherPhong", methods=["POST"])
 def ask_weather():
     app.logger.debug("\n\nInput: %s", request.json)
-    response = ServiceFactory().get_weather_service_phong().process(
-        json_data=request.json,
-        log=app.logger
-    )
+    response = response_cache.process(request.path, factory.get_weather_service_phong(), request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response)
 
 @app.route("/search/weather/format", methods=["POST"])
 def ask_weather_format():
     app.logger.debug("\n\nInput: %s", request.json)
-    response = ServiceFactory().get_weather_format_service().process(json_data=request.json, log=app.logger)
+    response = response_cache.process(request.path, factory.get_weather_format_service(), request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response)
 
 @app.route("/search/footballSchedule", methods=["POST"])
 def football_schedule():
     app.logger.debug("Input: %s", request.json)
-    response = ServiceFactory() \
-        .get_football_schedule_service() \
-        .process(json_data=request.json, log=app.logger)
+    response = response_cache.process(request.path, factory.get_football_schedule_service(), request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response), response.get("status", 200)
 
 @app.route("/search/searchAll", methods=["POST"])
 def search_all():
-    factory = ServiceFactory()
     service = factory.get_search_all_service()
-    response = service.process(json_data=request.json, log=app.logger)
+    response = response_cache.process(request.path, service, request.json, app.logger)
     return jsonify(response), response.get("status", 200)
 
 @app.route("/search/stockQuote", methods=["POST"])
 def stock_quote():
     app.logger.debug("Input: %s", request.json)
-    response = ServiceFactory().get_stock_quote_service().process(json_data=request.json, log=app.logger)
+    response = response_cache.process(request.path, factory.get_stock_quote_service(), request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response), response.get("status", 200)
 
 @app.route("/search/stockInfo", methods=["POST"])
 def stock_info():
     app.logger.debug("Input: %s", request.json)
-    service = ServiceFactory().get_stock_info_service()
-    response = service.process(json_data=request.json, log=app.logger)
+    service = factory.get_stock_info_service()
+    response = response_cache.process(request.path, service, request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response), response.get("status", 200)
 
 @app.route("/search/gold/format", methods=["POST"])
 def ask_gold_format():
     app.logger.debug("\n\nInput: %s", request.json)
-    service = ServiceFactory().get_gold_format_service()
-    response = service.process(json_data=request.json,log=app.logger)
+    service = factory.get_gold_format_service()
+    response = response_cache.process(request.path, service, request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response)
 
 @app.route("/search/movieInfo", methods=["POST"])
 def movie_info():
     app.logger.debug("\n\nInput: %s", request.json)
-    service = ServiceFactory().get_movie_info_service()
-    response = service.process(json_data=request.json, log=app.logger)
+    service = factory.get_movie_info_service()
+    response = response_cache.process(request.path, service, request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response), response.get("status", 200)
 
 @app.route("/search/wiki", methods=["POST"])
 def wiki_search():
     app.logger.debug("\n\nInput: %s", request.json)
-    service = ServiceFactory().get_wiki_search_service()
-    response = service.process(json_data=request.json, log=app.logger)
+    service = factory.get_wiki_search_service()
+    response = response_cache.process(request.path, service, request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response), response.get("status", 200)
 
 @app.route("/search/process-data", methods=["POST"])
 def process_data():
     app.logger.debug("\n\nInput: %s", request.json)
-    service = ServiceFactory().get_data_process_service()
-    response = service.process(json_data=request.json, log=app.logger)
+    service = factory.get_data_process_service()
+    response = response_cache.process(request.path, service, request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response), response.get("status", 200)
 
 @app.route("/search/lottery", methods=["POST"])
 def lottery():
     app.logger.debug("\n\nInput: %s", request.json)
-    service = ServiceFactory().get_lottery_service()
-    response = service.process(json_data=request.json, log=app.logger)
+    service = factory.get_lottery_service()
+    response = response_cache.process(request.path, service, request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response), response.get("status", 200)
 
 @app.route("/search/lottery-monthly-stats", methods=["POST"])
 def lottery_monthly_stats():
     app.logger.debug("\n\nInput: %s", request.json)
-    service = ServiceFactory().get_lottery_monthly_stats_service()
-    response = service.process(json_data=request.json, log=app.logger)
+    service = factory.get_lottery_monthly_stats_service()
+    response = response_cache.process(request.path, service, request.json, app.logger)
+    app.logger.debug("Response: %s", response)
+    return jsonify(response), response.get("status", 200)
+
+@app.route("/search/lottery-analytics", methods=["POST"])
+def lottery_analytics():
+    app.logger.debug("\n\nInput: %s", request.json)
+    service = factory.get_lottery_analytics_service()
+    response = response_cache.process(request.path, service, request.json, app.logger)
+    app.logger.debug("Response: %s", response)
+    return jsonify(response), response.get("status", 200)
+
+@app.route("/search/lottery-tickets", methods=["POST"])
+def lottery_tickets():
+    app.logger.debug("\n\nInput: %s", request.json)
+    service = factory.get_lottery_ticket_service()
+    response = response_cache.process(request.path, service, request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response), response.get("status", 200)
 
 @app.route("/search/dream-lottery", methods=["POST"])
 def dream_lottery():
     app.logger.debug("\n\nInput: %s", request.json)
-    service = ServiceFactory().get_dream_lottery_service()
-    response = service.process(json_data=request.json, log=app.logger)
+    service = factory.get_dream_lottery_service()
+    response = response_cache.process(request.path, service, request.json, app.logger)
+    app.logger.debug("Response: %s", response)
+    return jsonify(response), response.get("status", 200)
+
+@app.route("/search/batch", methods=["POST"])
+def batch():
+    app.logger.debug("\n\nInput: %s", request.json)
+    service = factory.get_batch_service()
+    response = response_cache.process(request.path, service, request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response), response.get("status", 200)
 
@@ -158,24 +176,43 @@ def translate_text():
 
 @app.route("/api/gold", methods=["POST"])
 def gold_price():
-    return handle_request(GoldPriceService(), request)
+    return handle_request(factory.get_gold_format_service(), request)
 
 @app.route("/search/calendar", methods=["POST"])
 def calendar():
     app.logger.debug("\n\nInput: %s", request.json)
-    service = ServiceFactory().get_calendar_service()
-    response = service.process(json_data=request.json, log=app.logger)
+    service = factory.get_calendar_service()
+    response = response_cache.process(request.path, service, request.json, app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response), response.get("status", 200)
 
 @app.route("/search/calendar-convert", methods=["POST"])
 def calendar_convert():
     app.logger.debug("\n\nInput: %s", request.json)
-    service = ServiceFactory().get_calendar_convert_service()
+    service = factory.get_calendar_convert_service()
     response = service.process_convert(json_data=request.json, log=app.logger)
     app.logger.debug("Response: %s", response)
     return jsonify(response), response.get("status", 200)
 
+@app.route("/search/cache-stats", methods=["GET"])
+def cache_stats():
+    return jsonify(response_cache.stats())
+
+@app.route("/search/http-stats", methods=["GET"])
+def http_stats():
+    return jsonify(http_client.stats())
+
+@app.route("/search/lottery-live-stats", methods=["GET"])
+def lottery_live_stats():
+    from lottery_live import live_poller
+    return jsonify(live_poller.stats())
+
+@app.route("/search/browser-stats", methods=["GET"])
+def browser_stats():
+    # Import khi cần để app không phải load selenium lúc khởi động
+    from browser_pool import browser_pool
+    return jsonify(browser_pool.stats())
+
 if __name__ == "__main__":
     # Chạy app ở chế độ debug để dễ theo dõi log
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,69 @@
+# asgi.py
+# Entry point async, chạy bằng: uvicorn asgi:app --host 0.0.0.0 --port 5000
+import os
+os.environ.setdefault('SERPAPI_API_KEY', 'e8e87504a12a592d143c4280e8ac79c15f4ee36f22e3dee07756b3853005c23a')
+
+import logging
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import async_http
+import http_client
+from response_cache import response_cache
+from service_factory import ServiceFactory, ENDPOINT_SERVICES
+
+logger = logging.getLogger("asgi")
+
+# Registry dùng chung với app.py
+factory = ServiceFactory()
+
+
+async def handle_request(request):
+    json_data = await request.json()
+    logger.debug("\n\nInput: %s", json_data)
+    service = factory.get_for_endpoint(request.url.path)
+    response = await response_cache.aprocess(request.url.path, service, json_data, logger)
+    logger.debug("Response: %s", response)
+    status = response.get("status", 200)
+    return JSONResponse(response, status_code=status if isinstance(status, int) else 200)
+
+
+async def cache_stats(request):
+    return JSONResponse(response_cache.stats())
+
+
+async def http_stats(request):
+    return JSONResponse(http_client.stats())
+
+
+async def browser_stats(request):
+    # Import khi cần để app không phải load selenium lúc khởi động
+    from browser_pool import browser_pool
+    return JSONResponse(browser_pool.stats())
+
+
+async def lottery_live_stats(request):
+    from lottery_live import live_poller
+    return JSONResponse(live_poller.stats())
+
+
+@asynccontextmanager
+async def lifespan(app):
+    factory.warm_up(os.getenv("WARM_UP_SERVICES", "").split(","), logger)
+    yield
+    await async_http.close()
+
+
+app = Starlette(
+    routes=[Route(endpoint, handle_request, methods=["POST"]) for endpoint in ENDPOINT_SERVICES]
+    + [
+        Route("/search/cache-stats", cache_stats, methods=["GET"]),
+        Route("/search/http-stats", http_stats, methods=["GET"]),
+        Route("/search/browser-stats", browser_stats, methods=["GET"]),
+        Route("/search/lottery-live-stats", lottery_live_stats, methods=["GET"])
+    ],
+    lifespan=lifespan
+)
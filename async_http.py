@@ -0,0 +1,58 @@
+# async_http.py
+
+import asyncio
+import os
+
+import aiohttp
+
+# Giới hạn số kết nối đồng thời của client async (toàn bộ và theo từng host)
+MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", 500))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS_PER_HOST", 50))
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=None, connect=5, sock_read=15)
+
+# Mỗi event loop có một ClientSession riêng, dùng chung cho mọi request trên loop đó
+_sessions = {}
+
+
+def get_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=MAX_CONNECTIONS,
+            limit_per_host=MAX_CONNECTIONS_PER_HOST,
+            ttl_dns_cache=300
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=DEFAULT_TIMEOUT,
+            headers={"User-Agent": "Mozilla/5.0"}
+        )
+        _sessions[loop] = session
+    return session
+
+
+def _clean_params(params):
+    # aiohttp không nhận giá trị bool/int trong query string như requests
+    if not params:
+        return params
+    return {k: str(v) for k, v in params.items()}
+
+
+async def get_text(url, params=None, headers=None, **kwargs) -> str:
+    async with get_session().get(url, params=_clean_params(params), headers=headers, **kwargs) as res:
+        res.raise_for_status()
+        return await res.text()
+
+
+async def get_json(url, params=None, headers=None, **kwargs):
+    async with get_session().get(url, params=_clean_params(params), headers=headers, **kwargs) as res:
+        res.raise_for_status()
+        return await res.json(content_type=None)
+
+
+async def close():
+    loop = asyncio.get_running_loop()
+    session = _sessions.pop(loop, None)
+    if session is not None and not session.closed:
+        await session.close()
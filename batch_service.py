@@ -0,0 +1,137 @@
+# batch_service.py
+
+import asyncio
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from response_cache import response_cache
+from service_factory import ServiceFactory
+
+
+class BatchService:
+    service_name = "batch_service"
+    endpoint = "/search/batch"
+
+    MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 20))
+    DEFAULT_TIMEOUT = 20  # giây, deadline cho cả batch
+    MAX_TIMEOUT = 60
+
+    # Pool dùng chung cho mọi batch, tránh mỗi batch tự tạo thread không giới hạn
+    _executor = ThreadPoolExecutor(
+        max_workers=int(os.getenv("BATCH_MAX_WORKERS", 16)),
+        thread_name_prefix="batch"
+    )
+
+    def __init__(self):
+        self.factory = ServiceFactory()
+
+    def _parse_request(self, json_data):
+        items = json_data.get("items")
+        if not isinstance(items, list) or not items:
+            raise ValueError("Bạn chưa cung cấp danh sách items.")
+        if len(items) > self.MAX_ITEMS:
+            raise ValueError(f"Tối đa {self.MAX_ITEMS} items trong một batch.")
+        try:
+            timeout = float(json_data.get("timeout", self.DEFAULT_TIMEOUT))
+        except (TypeError, ValueError):
+            timeout = self.DEFAULT_TIMEOUT
+        return items, min(max(timeout, 0), self.MAX_TIMEOUT)
+
+    def _resolve(self, item):
+        """Trả về (endpoint, service, payload) hoặc raise ValueError nếu item không hợp lệ."""
+        if not isinstance(item, dict):
+            raise ValueError("Item phải là object {endpoint, payload}.")
+        endpoint = item.get("endpoint", "")
+        if endpoint == self.endpoint:
+            raise ValueError("Không hỗ trợ batch lồng nhau.")
+        payload = item.get("payload") or {}
+        return endpoint, self.factory.get_for_endpoint(endpoint), payload
+
+    @staticmethod
+    def _item_result(endpoint, result):
+        status = result.get("status", 200) if isinstance(result, dict) else 200
+        return {"endpoint": endpoint, "status": status, "result": result}
+
+    @staticmethod
+    def _item_error(endpoint, status, message):
+        return {"endpoint": endpoint, "status": status, "message": message}
+
+    def process(self, json_data, log):
+        response = {"message": "Success", "status": 200}
+        started = time.monotonic()
+        try:
+            items, timeout = self._parse_request(json_data)
+        except ValueError as e:
+            response.update({"message": str(e), "status": 400})
+            return response
+
+        results = [None] * len(items)
+        futures = {}
+        for idx, item in enumerate(items):
+            try:
+                endpoint, service, payload = self._resolve(item)
+            except ValueError as e:
+                results[idx] = self._item_error(item.get("endpoint") if isinstance(item, dict) else None, 400, str(e))
+                continue
+            futures[self._executor.submit(response_cache.process, endpoint, service, payload, log)] = (idx, endpoint)
+
+        done, not_done = wait(futures, timeout=timeout)
+        for future, (idx, endpoint) in futures.items():
+            if future in not_done:
+                # Item chưa kịp chạy thì huỷ luôn, đang chạy thì bỏ qua kết quả
+                future.cancel()
+                results[idx] = self._item_error(endpoint, 504, f"Quá thời gian xử lý ({timeout}s).")
+                continue
+            try:
+                results[idx] = self._item_result(endpoint, future.result())
+            except Exception as e:
+                log.error(traceback.format_exc())
+                results[idx] = self._item_error(endpoint, 500, str(e))
+
+        response.update({
+            "results": results,
+            "elapsed": round(time.monotonic() - started, 3)
+        })
+        return response
+
+    async def aprocess(self, json_data, log):
+        response = {"message": "Success", "status": 200}
+        started = time.monotonic()
+        try:
+            items, timeout = self._parse_request(json_data)
+        except ValueError as e:
+            response.update({"message": str(e), "status": 400})
+            return response
+
+        results = [None] * len(items)
+        tasks = {}
+        for idx, item in enumerate(items):
+            try:
+                endpoint, service, payload = self._resolve(item)
+            except ValueError as e:
+                results[idx] = self._item_error(item.get("endpoint") if isinstance(item, dict) else None, 400, str(e))
+                continue
+            tasks[asyncio.ensure_future(response_cache.aprocess(endpoint, service, payload, log))] = (idx, endpoint)
+
+        if tasks:
+            done, not_done = await asyncio.wait(tasks, timeout=timeout)
+        else:
+            not_done = set()
+        for task, (idx, endpoint) in tasks.items():
+            if task in not_done:
+                task.cancel()
+                results[idx] = self._item_error(endpoint, 504, f"Quá thời gian xử lý ({timeout}s).")
+                continue
+            try:
+                results[idx] = self._item_result(endpoint, task.result())
+            except Exception as e:
+                log.error(traceback.format_exc())
+                results[idx] = self._item_error(endpoint, 500, str(e))
+
+        response.update({
+            "results": results,
+            "elapsed": round(time.monotonic() - started, 3)
+        })
+        return response
@@ -0,0 +1,106 @@
+# bench_html_parser.py
+# So sánh thời gian parse giữa các backend của html_parser trên các trang đã lưu sẵn.
+#
+#   python bench_html_parser.py --record            # tải các trang mẫu về bench_pages/
+#   python bench_html_parser.py -n 20 > bench_output.txt
+#   python bench_html_parser.py -n 20 --region     # chỉ parse vùng service cần
+
+import argparse
+import glob
+import os
+import statistics
+import time
+
+from html_parser import available_backends, make_soup
+
+# Trang mẫu của các scraper (mỗi service một trang tiêu biểu)
+SAMPLE_PAGES = {
+    "lottery": "https://kqxs.vn/",
+    "lottery_monthly": "https://www.kqxs.vn/thong-ke-tu-0-den-99",
+    "dream_lottery": "https://ngaydep.com/giai-ma-giac-mo-trung-so.html",
+    "weather": "https://www.accuweather.com/en/vn/hanoi/353412/weather-forecast/353412",
+    "football": "https://bongda24h.vn/bong-da/lich-thi-dau.html",
+    "movie_info": "https://www.imdb.com/find?q=inception",
+    "stock": "https://finance.vietstock.vn/VNM-ctcp-vnm.htm",
+    "wiki": "https://vi.wikipedia.org/wiki/H%C3%A0_N%E1%BB%99i",
+}
+
+
+# Vùng mà service thực sự đọc trên mỗi trang (xem make_soup(region=...))
+REGIONS = {
+    "lottery": ("table", {"class": "table-fixed tbldata table-result-lottery"}),
+    "lottery_monthly": ("table", {"class": "table-fixed tbldata table-result-lottery"}),
+    "dream_lottery": ("table", {"class": "week_tbl"}),
+}
+
+
+def record(pages_dir):
+    import http_client
+
+    os.makedirs(pages_dir, exist_ok=True)
+    for name, url in SAMPLE_PAGES.items():
+        try:
+            html = http_client.get(url, verify=False).text
+        except Exception as e:
+            print(f"skip {name}: {e}")
+            continue
+        with open(os.path.join(pages_dir, f"{name}.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"saved {name}: {len(html)} bytes")
+
+
+def normalized_text(soup):
+    # So sánh kết quả giữa các backend theo text hiển thị, bỏ qua khác biệt về khoảng trắng
+    return " ".join(soup.get_text(" ").split())
+
+
+def bench(pages_dir, repeat, use_region=False):
+    files = sorted(glob.glob(os.path.join(pages_dir, "*.html")))
+    if not files:
+        print(f"Không có trang nào trong {pages_dir}, chạy với --record trước")
+        return
+    backends = available_backends()
+    print(f"backends: {', '.join(backends)}  repeat: {repeat}  region: {'on' if use_region else 'off'}")
+    print(f"{'page':<18}{'size':>10}  " + "".join(f"{b:>14}" for b in backends) + "  same_text")
+    totals = {b: 0.0 for b in backends}
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        name = os.path.splitext(os.path.basename(path))[0]
+        region = REGIONS.get(name) if use_region else None
+        timings = {}
+        texts = {}
+        for backend in backends:
+            runs = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                soup = make_soup(html, backend, region=region)
+                runs.append(time.perf_counter() - started)
+            timings[backend] = statistics.median(runs)
+            totals[backend] += timings[backend]
+            texts[backend] = normalized_text(soup)
+        same = len(set(texts.values())) == 1
+        print(f"{name:<18}{len(html):>10}  "
+              + "".join(f"{timings[b] * 1000:>12.1f}ms" for b in backends)
+              + f"  {'yes' if same else 'NO'}")
+    baseline = totals["html.parser"]
+    print(f"{'total':<28}  " + "".join(f"{totals[b] * 1000:>12.1f}ms" for b in backends))
+    print(f"{'speedup vs html.parser':<28}  "
+          + "".join(f"{(baseline / totals[b] if totals[b] else 0):>13.1f}x" for b in backends))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark các backend parse HTML")
+    parser.add_argument("--pages", default="bench_pages", help="thư mục chứa các trang .html đã lưu")
+    parser.add_argument("-n", "--repeat", type=int, default=10, help="số lần parse mỗi trang")
+    parser.add_argument("--record", action="store_true", help="tải lại các trang mẫu trước khi đo")
+    parser.add_argument("--region", action="store_true", help="chỉ parse vùng mà service dùng (REGIONS)")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.pages)
+    bench(args.pages, args.repeat, args.region)
+
+
+if __name__ == "__main__":
+    main()
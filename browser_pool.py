@@ -0,0 +1,172 @@
+# browser_pool.py
+# Pool các Chrome headless đã khởi động sẵn, dùng chung cho các service cần render JavaScript.
+
+import atexit
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Tài nguyên không cần cho việc đọc dữ liệu, chặn để trang load nhanh hơn
+BLOCKED_URLS = [
+    "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico"
+]
+
+
+class BrowserPool:
+    def __init__(self, size=2, max_pages=50, checkout_timeout=30):
+        self.size = size
+        # Sau max_pages lần dùng thì bỏ browser, tránh rò rỉ bộ nhớ của Chrome chạy lâu
+        self.max_pages = max_pages
+        self.checkout_timeout = checkout_timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "created": 0, "checkouts": 0, "recycled": 0, "crashed": 0,
+            "wait_total": 0.0, "wait_max": 0.0
+        }
+
+    @staticmethod
+    def _create_driver():
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.fonts": 2,
+        })
+        # Không đợi ảnh/iframe load xong, chỉ cần DOM sẵn sàng
+        chrome_options.page_load_strategy = "eager"
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+        return driver
+
+    @staticmethod
+    def _is_alive(driver):
+        try:
+            driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _acquire_driver(self):
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_alive(driver):
+                return driver
+            # Browser chết khi đang nằm trong pool
+            self._discard(driver, "crashed")
+        driver = self._create_driver()
+        with self._lock:
+            self._pages[driver] = 0
+            self._stats["created"] += 1
+        return driver
+
+    def _discard(self, driver, reason):
+        with self._lock:
+            self._pages.pop(driver, None)
+            self._stats[reason] += 1
+        self._quit(driver)
+
+    @contextmanager
+    def driver(self):
+        """Mượn một browser trong pool, tự trả lại (hoặc bỏ đi nếu lỗi/hết lượt) khi xong."""
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise TimeoutError(f"Không lấy được browser trong {self.checkout_timeout}s")
+        waited = time.monotonic() - started
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["wait_total"] += waited
+            self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+
+        driver = None
+        broken = False
+        try:
+            driver = self._acquire_driver()
+            yield driver
+        except (NoSuchElementException, TimeoutException):
+            # Lỗi do trang, browser vẫn dùng tiếp được
+            raise
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            if driver is not None:
+                with self._lock:
+                    self._pages[driver] = self._pages.get(driver, 0) + 1
+                    pages = self._pages[driver]
+                if broken:
+                    self._discard(driver, "crashed")
+                elif pages >= self.max_pages:
+                    self._discard(driver, "recycled")
+                else:
+                    self._idle.put(driver)
+            self._slots.release()
+
+    def fetch_element_html(self, url, by, value, timeout=10):
+        """Mở url, đợi element xuất hiện và chỉ trả về HTML của element đó."""
+        with self.driver() as driver:
+            driver.get(url)
+            element = WebDriverWait(driver, timeout).until(EC.presence_of_element_located((by, value)))
+            return element.get_attribute("outerHTML")
+
+    def fetch_elements_html(self, url, wait_for, selectors, timeout=10):
+        """Mở url, đợi `wait_for` xuất hiện rồi trả về HTML (nối lại) của các element trong `selectors`."""
+        with self.driver() as driver:
+            driver.get(url)
+            WebDriverWait(driver, timeout).until(EC.presence_of_element_located(wait_for))
+            parts = []
+            for by, value in selectors:
+                for element in driver.find_elements(by, value):
+                    parts.append(element.get_attribute("outerHTML"))
+            return "\n".join(parts)
+
+    def close(self):
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(driver)
+
+    def stats(self):
+        with self._lock:
+            checkouts = self._stats["checkouts"]
+            return {
+                **self._stats,
+                "size": self.size,
+                "alive": len(self._pages),
+                "idle": self._idle.qsize(),
+                "wait_avg": round(self._stats["wait_total"] / checkouts, 4) if checkouts else 0.0
+            }
+
+
+browser_pool = BrowserPool(
+    size=int(os.getenv("BROWSER_POOL_SIZE", 2)),
+    max_pages=int(os.getenv("BROWSER_POOL_MAX_PAGES", 50))
+)
+atexit.register(browser_pool.close)
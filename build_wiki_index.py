@@ -0,0 +1,184 @@
+# build_wiki_index.py
+# Build index offline cho WikiSearchService từ dump Wikipedia tiếng Việt.
+#
+#   python build_wiki_index.py viwiki-20250101-cirrussearch-content.json.gz wiki_index/
+#   python build_wiki_index.py articles.jsonl wiki_index/ --format jsonl --limit 100000
+#
+# Đầu vào:
+#   - cirrus: dump CirrusSearch (dumps.wikimedia.org/other/cirrussearch/), đã có sẵn text thuần
+#   - jsonl: mỗi dòng {"pageid", "title", "text", "first_paragraph"?, "revid"?}
+# Sau khi build, đặt WIKI_OFFLINE_INDEX=wiki_index/ để bật chế độ offline.
+
+import argparse
+import bz2
+import gzip
+import json
+import os
+import time
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from wiki_offline_index import (
+    DOCS_FILE, INDEX_VERSION, LENGTHS_FILE, META_FILE, OFFSETS_FILE, POSTING_DOCS_FILE,
+    POSTING_TFS_FILE, TERMS_FILE, TEXTS_FILE, tokenize
+)
+
+TITLE_WEIGHT = 3  # token trong tiêu đề được tính như xuất hiện 3 lần
+
+
+def open_dump(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def first_paragraph_of(text):
+    for part in (text or "").split("\n"):
+        if part.strip():
+            return part.strip()
+    return ""
+
+
+def read_cirrus(path):
+    """Dump CirrusSearch: các cặp dòng {"index": {"_id": pageid}} rồi tới document."""
+    pageid = None
+    with open_dump(path) as f:
+        for line in f:
+            data = json.loads(line)
+            if "index" in data:
+                pageid = int(data["index"]["_id"])
+                continue
+            # Chỉ lấy bài viết (namespace 0)
+            if data.get("namespace", 0) != 0 or pageid is None:
+                continue
+            yield {
+                "pageid": pageid,
+                "title": data.get("title", ""),
+                "revid": data.get("version"),
+                "text": data.get("text", ""),
+                "first_paragraph": first_paragraph_of(data.get("opening_text") or data.get("text", ""))
+            }
+
+
+def read_jsonl(path):
+    with open_dump(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            yield {
+                "pageid": int(data["pageid"]),
+                "title": data.get("title", ""),
+                "revid": data.get("revid"),
+                "text": data.get("text", ""),
+                "first_paragraph": data.get("first_paragraph") or first_paragraph_of(data.get("text", ""))
+            }
+
+
+def build_index(documents, out_dir, index_chars=5000, limit=None, k1=1.2, b=0.75, log_every=10000):
+    os.makedirs(out_dir, exist_ok=True)
+    # Xoá meta.json cũ trước khi ghi đè các file khác: build lại mà dừng giữa chừng thì loader
+    # thấy index chưa hoàn chỉnh thay vì ghép meta cũ với posting/offset mới
+    meta_path = os.path.join(out_dir, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    started = time.monotonic()
+    docs = []
+    offsets = array("q")
+    lengths = array("f")
+    postings = {}  # term -> (array docid, array tf)
+    position = 0
+
+    with open(os.path.join(out_dir, TEXTS_FILE), "wb") as texts:
+        for doc in documents:
+            if limit is not None and len(docs) >= limit:
+                break
+            if not doc["text"] and not doc["first_paragraph"]:
+                continue
+            docid = len(docs)
+            docs.append([doc["pageid"], doc["title"], doc["revid"]])
+
+            # Text lưu nguyên vẹn, đoạn văn đầu đặt ngay trước để đọc bằng một lần cắt
+            first_bytes = doc["first_paragraph"].encode("utf-8")
+            text_bytes = doc["text"].encode("utf-8")
+            texts.write(first_bytes)
+            texts.write(text_bytes)
+            offsets.extend((position, len(first_bytes), len(text_bytes)))
+            position += len(first_bytes) + len(text_bytes)
+
+            # Chỉ index phần đầu bài (phần liên quan nhất) để index gọn
+            counts = Counter(tokenize(doc["text"][:index_chars]))
+            for token in tokenize(doc["title"]):
+                counts[token] += TITLE_WEIGHT
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = (array("I"), array("I"))
+                entry[0].append(docid)
+                entry[1].append(tf)
+
+            if log_every and len(docs) % log_every == 0:
+                print(f"{len(docs)} bài, {len(postings)} term, {time.monotonic() - started:.0f}s")
+
+    # Ghi posting của mọi term nối liền nhau, terms.json giữ vị trí bắt đầu và độ dài
+    terms = {}
+    total = sum(len(entry[0]) for entry in postings.values())
+    posting_docs = np.lib.format.open_memmap(
+        os.path.join(out_dir, POSTING_DOCS_FILE), mode="w+", dtype=np.uint32, shape=(total,))
+    posting_tfs = np.lib.format.open_memmap(
+        os.path.join(out_dir, POSTING_TFS_FILE), mode="w+", dtype=np.uint32, shape=(total,))
+    start = 0
+    for term in sorted(postings):
+        doc_ids, tfs = postings[term]
+        posting_docs[start:start + len(doc_ids)] = np.frombuffer(doc_ids, dtype=np.uint32)
+        posting_tfs[start:start + len(tfs)] = np.frombuffer(tfs, dtype=np.uint32)
+        terms[term] = [start, len(doc_ids)]
+        start += len(doc_ids)
+    posting_docs.flush()
+    posting_tfs.flush()
+
+    np.save(os.path.join(out_dir, OFFSETS_FILE), np.frombuffer(offsets, dtype=np.int64).reshape(-1, 3))
+    np.save(os.path.join(out_dir, LENGTHS_FILE), np.frombuffer(lengths, dtype=np.float32))
+    with open(os.path.join(out_dir, DOCS_FILE), "w", encoding="utf-8") as f:
+        json.dump(docs, f, ensure_ascii=False)
+    with open(os.path.join(out_dir, TERMS_FILE), "w", encoding="utf-8") as f:
+        json.dump(terms, f, ensure_ascii=False)
+    meta = {
+        "version": INDEX_VERSION,
+        "documents": len(docs),
+        "terms": len(terms),
+        "postings": total,
+        "avgdl": (sum(lengths) / len(lengths)) if lengths else 0.0,
+        "k1": k1,
+        "b": b,
+        "index_chars": index_chars,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    # meta.json ghi cuối cùng (ghi file tạm rồi đổi tên): thiếu file này nghĩa là index build dở
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+    print(f"Xong: {len(docs)} bài, {len(terms)} term, {total} posting trong {time.monotonic() - started:.0f}s")
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build index offline cho WikiSearchService")
+    parser.add_argument("dump", help="file dump (.json, .jsonl, có thể nén .gz/.bz2)")
+    parser.add_argument("out_dir", help="thư mục ghi index")
+    parser.add_argument("--format", choices=["cirrus", "jsonl"], default="cirrus")
+    parser.add_argument("--limit", type=int, default=None, help="chỉ lấy N bài đầu tiên")
+    parser.add_argument("--index-chars", type=int, default=5000, help="số ký tự đầu mỗi bài được index")
+    args = parser.parse_args()
+
+    reader = read_cirrus if args.format == "cirrus" else read_jsonl
+    build_index(reader(args.dump), args.out_dir, index_chars=args.index_chars, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 import traceback
-import requests
-from bs4 import BeautifulSoup
+import http_client
+from html_parser import make_soup, html_to_text
 from common_service import CommonService
 
 class CalendarService(CommonService):
     service_name = "calendar_service"
+    cache_ttl = 30 * 24 * 3600  # kết quả đổi ngày không thay đổi theo thời gian
+    INFO_TABLES = ("table", {"class": "table1"})
 
     def process(self, json_data, log):
         """
@@ -31,9 +33,10 @@ class CalendarService(CommonService):
                 "Year": year,
                 "Type": type_num
             }
-            res = requests.get(url, params=params, timeout=10)
+            res = http_client.get(url, params=params, timeout=10)
             res.raise_for_status()
-            soup = BeautifulSoup(res.text, "html.parser")
+            # Mọi thông tin đều nằm trong các bảng table1, chỉ dựng cây cho các bảng này
+            soup = make_soup(res.text, region=self.INFO_TABLES)
 
             result = {}
             # Parse bảng chính (dương lịch, âm lịch, can chi, ngũ hành, ngày, tiết khí)
@@ -158,7 +161,7 @@ class CalendarService(CommonService):
                     td = table.select_one("tbody > tr:not(.bg-td) > td")
                     if td:
                         huong_xuat_hanh = td.decode_contents().replace('<br>', '\n')
-                        huong_xuat_hanh = BeautifulSoup(huong_xuat_hanh, "html.parser").get_text("\n", strip=True)
+                        huong_xuat_hanh = html_to_text(huong_xuat_hanh, "\n", strip=True)
                     break
             result["huong_xuat_hanh"] = huong_xuat_hanh
 
@@ -171,7 +174,7 @@ class CalendarService(CommonService):
                     if td:
                         html = td.decode_contents().replace('<br>', '\n')
                         html = html.replace('<i>', '*').replace('</i>', '*')
-                        xuat_hanh_khong_minh = BeautifulSoup(html, "html.parser").get_text("\n", strip=True)
+                        xuat_hanh_khong_minh = html_to_text(html, "\n", strip=True)
                     break
             result["xuat_hanh_khong_minh"] = xuat_hanh_khong_minh
 
@@ -1,11 +1,45 @@
 # common_service.py
 
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
 from serp import Serp
 
+# Thread pool cho các service chưa có aprocess native, để event loop không bị block
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ASYNC_BLOCKING_WORKERS", 64)),
+    thread_name_prefix="service"
+)
+
+
+async def run_service_async(service, json_data, log):
+    """Chạy service theo kiểu async: dùng aprocess nếu có, nếu không thì đẩy process sang thread pool."""
+    aprocess = getattr(service, "aprocess", None)
+    if aprocess is not None:
+        return await aprocess(json_data, log)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_executor, service.process, json_data, log)
+
+
 class CommonService:
+    # Các host được mở sẵn kết nối khi warm up
+    warm_up_urls = []
+
     def __init__(self):
         # bây giờ Serp là class bạn vừa viết
         self.serp = Serp()
 
     def process(self, json_data, log):
         raise NotImplementedError("Các service con phải override method này")
+
+    async def aprocess(self, json_data, log):
+        # Mặc định chạy process (blocking) trong thread pool, service con override để chạy I/O async thực sự
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_blocking_executor, self.process, json_data, log)
+
+    def warm_up(self, log):
+        # Gọi lúc khởi động app (WARM_UP_SERVICES), service con override nếu cần khởi tạo thêm
+        for url in self.warm_up_urls:
+            http_client.preconnect(url)
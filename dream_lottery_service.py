@@ -1,14 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
+import http_client
+from html_parser import make_soup
 
 class DreamLotteryService:
     service_name = 'dream_lottery_service'
+    cache_ttl = 86400
     url = "https://ngaydep.com/giai-ma-giac-mo-trung-so.html"
+    # Chỉ parse bảng giải mã, phần còn lại của trang không dùng tới
+    DREAM_TABLE = ("table", {"class": "week_tbl"})
 
     def fetch_dream_lottery(self):
         headers = {"User-Agent": "Mozilla/5.0"}
-        res = requests.get(self.url, headers=headers, timeout=10)
-        soup = BeautifulSoup(res.text, "html.parser")
+        res = http_client.get(self.url, headers=headers, timeout=10)
+        soup = make_soup(res.text, region=self.DREAM_TABLE)
         table = soup.find("table", class_="week_tbl")
         result = []
         formatted_context = []
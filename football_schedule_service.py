@@ -3,15 +3,17 @@
 import re
 import uuid
 import traceback
-import requests
+import http_client
 from datetime import datetime
-from bs4 import BeautifulSoup
+from html_parser import make_soup
 
 from common_service import CommonService
 
 
 class FootballScheduleService(CommonService):
     service_name = "football_schedule_service"
+    cache_ttl = 300
+    warm_up_urls = ["https://bongda24h.vn"]
 
     FIXTURE_URLS = {
         "Premier League": "https://bongda24h.vn/bong-da-anh/lich-thi-dau-1.html",
@@ -23,6 +25,7 @@ class FootballScheduleService(CommonService):
         "V League": "https://bongda24h.vn/vleague/lich-thi-dau-25.html"
     }
     GLOBAL_FIXTURE_URL = "https://bongda24h.vn/bong-da/lich-thi-dau.html"
+    FIXTURES_BLOCK = ("div", {"class": "match-football"})
 
     def __init__(self):
         super(FootballScheduleService, self).__init__()
@@ -111,8 +114,10 @@ class FootballScheduleService(CommonService):
     @staticmethod
     def _get_fixtures_from_url(url):
         headers = {"User-Agent": "Mozilla/5.0"}
-        res = requests.get(url, headers=headers)
-        soup = BeautifulSoup(res.text, "html.parser")
+        # Trang có thể có nhiều khối lịch thi đấu (mỗi giải một khối) nên phải tải cả trang,
+        # chỉ dựng cây cho các khối đó
+        html = http_client.get_text(url, headers=headers)
+        soup = make_soup(html, region=FootballScheduleService.FIXTURES_BLOCK)
 
         fixtures = []
         for match in soup.select("div.match-football div.f-row.matchdetail"):
@@ -1,29 +1,28 @@
 import traceback
-import requests
+import http_client
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from html_parser import make_soup
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
 import threading
 from concurrent.futures import ThreadPoolExecutor
 
+from browser_pool import browser_pool
 from common_service import CommonService
+from single_flight import upstream
 
 class GoldPriceService(CommonService):
     service_name = "gold_price_service"
+    cache_ttl = 300  # giây
     
     # Cache data
     _cache = {}
     _cache_lock = threading.Lock()
     _cache_timeout = 300  # 5 minutes
-    
+
     def __init__(self):
         super(GoldPriceService, self).__init__()
-        self.session = requests.Session()
+        # Session riêng cho header giả lập trình duyệt, connection pool dùng chung qua http_client
+        self.session = http_client.new_session()
         self.session.headers.update({
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
@@ -31,6 +30,10 @@ class GoldPriceService(CommonService):
             "Connection": "keep-alive"
         })
 
+    def warm_up(self, log):
+        # Mở sẵn kết nối TLS tới 24h.com.vn để request đầu tiên không phải handshake
+        http_client.head("https://www.24h.com.vn/gia-vang-hom-nay-c425.html", session=self.session, retries=0)
+
     def _get_cached_data(self, key):
         with self._cache_lock:
             if key in self._cache:
@@ -57,9 +60,12 @@ class GoldPriceService(CommonService):
                 return cached_data, url
 
             # Fetch và parse bảng
-            res = self.session.get(url, timeout=10)
-            res.raise_for_status()
-            soup = BeautifulSoup(res.text, "html.parser")
+            def fetch():
+                res = http_client.get(url, session=self.session, timeout=10)
+                res.raise_for_status()
+                return res.text
+
+            soup = make_soup(upstream.do(url, fetch))
             rows = soup.select("table.gia-vang-search-data-table tbody tr")
 
             prices = []
@@ -127,95 +133,96 @@ class GoldPriceService(CommonService):
             if cached_data:
                 return cached_data
 
-            # Khởi tạo Chrome options
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            
-            # Khởi tạo driver
-            driver = webdriver.Chrome(options=chrome_options)
-            driver.get(cafef_url)
-            
-            # Đợi cho các element load xong
-            wait = WebDriverWait(driver, 10)
-            wait.until(EC.presence_of_element_located((By.ID, "gia_mua_vao")))
-            
-            # Lấy HTML sau khi JavaScript đã chạy
-            html = driver.page_source
-            driver.quit()
-            
-            # Parse HTML
-            cafef_soup = BeautifulSoup(html, "html.parser")
-            
-            # Lấy tab vàng miếng SJC và nhẫn
-            def parse_tab(tab, prefix=""):
-                if not tab:
-                    return None, None
-                title = tab.select_one(".title_name_tab_mieng_nhan")
-                name = title.text.strip() if title else ("sjc" if not prefix else "nhan")
-                
-                # Tìm giá trong div.bang_gia_vang_mieng_nhan
-                bang_gia = tab.select_one(f".bang_gia_vang_mieng_nhan#bang_gia_hien_tai_trong_nuoc{prefix}")
-                if not bang_gia:
-                    return name, None
-                    
-                # Lấy giá mua vào và bán ra
-                mua_vao = bang_gia.select_one(f"p#gia_mua_vao{prefix}")
-                ban_ra = bang_gia.select_one(f"p#gia_ban_ra{prefix}")
-                
-                # Lấy thay đổi giá
-                change_mua = bang_gia.select_one(f"p#gia_thay_doi_mua{prefix}")
-                change_ban = bang_gia.select_one(f"p#gia_thay_doi_ban{prefix}")
-                
-                # Xử lý text của thay đổi giá (loại bỏ icon và format lại)
-                def clean_change(el):
-                    if not el:
-                        return None
-                    text = el.text.strip()
-                    if not text:
-                        return None
-                    # Loại bỏ icon và khoảng trắng
-                    text = text.replace("iconDown", "").replace("iconUp", "").strip()
-                    return text
-                    
-                return name, {
-                    "mua_vao": mua_vao.text.strip() if mua_vao else None,
-                    "ban_ra": ban_ra.text.strip() if ban_ra else None,
-                    "change_mua": clean_change(change_mua),
-                    "change_ban": clean_change(change_ban)
-                }
-            
-            sjc_tab = cafef_soup.find("div", id="name_tab_vang_mieng")
-            nhan_tab = cafef_soup.find("div", id="name_tab_vang_nhan")
-            gold_types = {}
-            name_sjc, sjc = parse_tab(sjc_tab, "")
-            if name_sjc and sjc:
-                gold_types[name_sjc] = sjc
-            name_nhan, nhan = parse_tab(nhan_tab, "_nhan")
-            if name_nhan and nhan:
-                gold_types[name_nhan] = nhan
-            
-            # Lấy chênh lệch vàng thế giới
-            sapo_chart = cafef_soup.find("div", class_="sapo_chart_dien_bien")
-            chenh_lech = None
-            if sapo_chart:
-                chenh_lech_text = sapo_chart.text.strip()
-                chenh_lech_span = sapo_chart.find("span", class_="color_note_chenh_lech")
-                if chenh_lech_span:
-                    chenh_lech = chenh_lech_text
-            
-            cafef_data = {
-                "gold_types": gold_types,
-                "world_gold_price_difference": chenh_lech,
-                "cafef_source": cafef_url
-            }
+            cafef_data = self._get_cafef_browser_data(cafef_url)
             self._set_cached_data(cache_key, cafef_data)
             return cafef_data
         except Exception as e:
             log.error(f"Error getting cafef data: {str(e)}")
             return {"cafef_error": str(e)}
 
+    def _get_cafef_browser_data(self, cafef_url):
+        """Lấy giá vàng trong nước từ trang cafef đã render bằng browser"""
+        # Đợi JavaScript điền giá rồi chỉ lấy HTML của 2 tab giá và đoạn chênh lệch,
+        # các request đồng thời dùng chung một lần load trang
+        html = upstream.do(cafef_url, lambda: browser_pool.fetch_elements_html(
+            cafef_url,
+            wait_for=(By.ID, "gia_mua_vao"),
+            selectors=[
+                (By.ID, "name_tab_vang_mieng"),
+                (By.ID, "name_tab_vang_nhan"),
+                (By.CLASS_NAME, "sapo_chart_dien_bien"),
+            ]
+        ))
+        
+        return self._parse_cafef_html(html, cafef_url)
+
+    def _parse_cafef_html(self, html, cafef_url):
+        """Parse HTML giá vàng trong nước của cafef (đã render)"""
+        cafef_soup = make_soup(html)
+        
+        # Lấy tab vàng miếng SJC và nhẫn
+        def parse_tab(tab, prefix=""):
+            if not tab:
+                return None, None
+            title = tab.select_one(".title_name_tab_mieng_nhan")
+            name = title.text.strip() if title else ("sjc" if not prefix else "nhan")
+            
+            # Tìm giá trong div.bang_gia_vang_mieng_nhan
+            bang_gia = tab.select_one(f".bang_gia_vang_mieng_nhan#bang_gia_hien_tai_trong_nuoc{prefix}")
+            if not bang_gia:
+                return name, None
+                
+            # Lấy giá mua vào và bán ra
+            mua_vao = bang_gia.select_one(f"p#gia_mua_vao{prefix}")
+            ban_ra = bang_gia.select_one(f"p#gia_ban_ra{prefix}")
+            
+            # Lấy thay đổi giá
+            change_mua = bang_gia.select_one(f"p#gia_thay_doi_mua{prefix}")
+            change_ban = bang_gia.select_one(f"p#gia_thay_doi_ban{prefix}")
+            
+            # Xử lý text của thay đổi giá (loại bỏ icon và format lại)
+            def clean_change(el):
+                if not el:
+                    return None
+                text = el.text.strip()
+                if not text:
+                    return None
+                # Loại bỏ icon và khoảng trắng
+                text = text.replace("iconDown", "").replace("iconUp", "").strip()
+                return text
+                
+            return name, {
+                "mua_vao": mua_vao.text.strip() if mua_vao else None,
+                "ban_ra": ban_ra.text.strip() if ban_ra else None,
+                "change_mua": clean_change(change_mua),
+                "change_ban": clean_change(change_ban)
+            }
+        
+        sjc_tab = cafef_soup.find("div", id="name_tab_vang_mieng")
+        nhan_tab = cafef_soup.find("div", id="name_tab_vang_nhan")
+        gold_types = {}
+        name_sjc, sjc = parse_tab(sjc_tab, "")
+        if name_sjc and sjc:
+            gold_types[name_sjc] = sjc
+        name_nhan, nhan = parse_tab(nhan_tab, "_nhan")
+        if name_nhan and nhan:
+            gold_types[name_nhan] = nhan
+        
+        # Lấy chênh lệch vàng thế giới
+        sapo_chart = cafef_soup.find("div", class_="sapo_chart_dien_bien")
+        chenh_lech = None
+        if sapo_chart:
+            chenh_lech_text = sapo_chart.text.strip()
+            chenh_lech_span = sapo_chart.find("span", class_="color_note_chenh_lech")
+            if chenh_lech_span:
+                chenh_lech = chenh_lech_text
+        
+        return {
+            "gold_types": gold_types,
+            "world_gold_price_difference": chenh_lech,
+            "cafef_source": cafef_url
+        }
+
     def _get_world_gold_data(self, date, log):
         """Lấy giá vàng thế giới từ cafef.vn bằng Selenium"""
         try:
@@ -226,83 +233,84 @@ class GoldPriceService(CommonService):
                 return cached_data
 
             cafef_url = "https://cafef.vn/du-lieu/gia-vang-hom-nay/the-gioi.chn#data"
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            driver = webdriver.Chrome(options=chrome_options)
-            driver.get(cafef_url)
-
-            # Đợi phần giá vàng quốc tế xuất hiện
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "gia_vang_hien_tai"))
-            )
-            html = driver.page_source
-            driver.quit()
-
-            soup = BeautifulSoup(html, "html.parser")
-
-            # Tìm container chính
-            price_box = soup.find("div", class_="gia_vang_hien_tai")
-            if not price_box:
-                return {"world_gold_error": "Không tìm thấy box giá vàng quốc tế"}
-
-            # Lấy giá USD
-            price_usd = None
-            price_usd_div = price_box.find("div", class_="price_vang_dola")
-            if price_usd_div:
-                try:
-                    price_usd = float(price_usd_div.text.replace(",", "").strip())
-                except:
-                    pass
-
-            # Lấy thay đổi và phần trăm
-            change_usd = None
-            change_percent = None
-            price_change_div = price_box.find("div", class_="priceChange_vang_dola")
-            if price_change_div:
-                change_text = price_change_div.find("div", class_="down")
-                if change_text:
-                    try:
-                        change_parts = change_text.text.strip().split()
-                        if len(change_parts) >= 2:
-                            change_usd = float(change_parts[0])
-                            change_percent = change_parts[1].strip("()%")
-                    except:
-                        pass
-
-            # Lấy thời gian cập nhật
-            updated_at = None
-            time_div = price_box.find("div", id="time_update_gia_vang")
-            if time_div:
-                updated_at = time_div.text.replace("Cập nhật lúc", "").strip()
-
-            # Lấy giá quy đổi VND
-            price_vnd = None
-            note_div = price_box.find("div", class_="note_gia_vang_quoc_te")
-            if note_div:
-                for li in note_div.find_all("li"):
-                    if "1 Ounce =" in li.text:
-                        vnd_text = li.text.split("=")[1].strip()
-                        price_vnd = vnd_text.replace("VNĐ", "").strip()
-                        break
-
-            formatted_data = {
-                "world_gold": {
-                    "price_usd": price_usd,
-                    "change_usd": change_usd,
-                    "change_percent": change_percent,
-                    "price_vnd": price_vnd,
-                    "updated_at": updated_at,
-                    "source": cafef_url
-                }
-            }
+            formatted_data = self._get_world_gold_browser_data(cafef_url)
+            if "world_gold_error" in formatted_data:
+                return formatted_data
             self._set_cached_data(cache_key, formatted_data)
             return formatted_data
         except Exception as e:
             log.error(f"Error getting world gold data: {str(e)}")
             return {"world_gold_error": str(e)}
 
+    def _get_world_gold_browser_data(self, cafef_url):
+        """Lấy giá vàng thế giới từ trang cafef đã render bằng browser"""
+        # Đợi phần giá vàng quốc tế xuất hiện, chỉ lấy HTML của box đó
+        html = upstream.do(cafef_url, lambda: browser_pool.fetch_element_html(
+            cafef_url, By.CLASS_NAME, "gia_vang_hien_tai"
+        ))
+
+        return self._parse_world_gold_html(html, cafef_url)
+
+    def _parse_world_gold_html(self, html, cafef_url):
+        """Parse HTML box giá vàng thế giới của cafef (đã render)"""
+        soup = make_soup(html)
+
+        # Tìm container chính
+        price_box = soup.find("div", class_="gia_vang_hien_tai")
+        if not price_box:
+            return {"world_gold_error": "Không tìm thấy box giá vàng quốc tế"}
+
+        # Lấy giá USD
+        price_usd = None
+        price_usd_div = price_box.find("div", class_="price_vang_dola")
+        if price_usd_div:
+            try:
+                price_usd = float(price_usd_div.text.replace(",", "").strip())
+            except:
+                pass
+
+        # Lấy thay đổi và phần trăm
+        change_usd = None
+        change_percent = None
+        price_change_div = price_box.find("div", class_="priceChange_vang_dola")
+        if price_change_div:
+            change_text = price_change_div.find("div", class_="down")
+            if change_text:
+                try:
+                    change_parts = change_text.text.strip().split()
+                    if len(change_parts) >= 2:
+                        change_usd = float(change_parts[0])
+                        change_percent = change_parts[1].strip("()%")
+                except:
+                    pass
+
+        # Lấy thời gian cập nhật
+        updated_at = None
+        time_div = price_box.find("div", id="time_update_gia_vang")
+        if time_div:
+            updated_at = time_div.text.replace("Cập nhật lúc", "").strip()
+
+        # Lấy giá quy đổi VND
+        price_vnd = None
+        note_div = price_box.find("div", class_="note_gia_vang_quoc_te")
+        if note_div:
+            for li in note_div.find_all("li"):
+                if "1 Ounce =" in li.text:
+                    vnd_text = li.text.split("=")[1].strip()
+                    price_vnd = vnd_text.replace("VNĐ", "").strip()
+                    break
+
+        return {
+            "world_gold": {
+                "price_usd": price_usd,
+                "change_usd": change_usd,
+                "change_percent": change_percent,
+                "price_vnd": price_vnd,
+                "updated_at": updated_at,
+                "source": cafef_url
+            }
+        }
+
     def _format_world_gold_context(self, world_gold_data):
         """Format world gold price data into readable text"""
         try:
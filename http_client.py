@@ -0,0 +1,197 @@
+# http_client.py
+# Client HTTP dùng chung cho mọi service: connection pool + keep-alive, timeout mặc định,
+# retry có backoff ngẫu nhiên và thống kê theo từng host.
+
+import codecs
+import os
+import random
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from html_parser import RegionTracker
+from single_flight import upstream
+
+try:
+    import brotli  # noqa: F401  (urllib3 tự giải nén br nếu có thư viện)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# (connect, read) timeout mặc định, tính bằng giây
+DEFAULT_TIMEOUT = (
+    float(os.getenv("HTTP_CONNECT_TIMEOUT", 5)),
+    float(os.getenv("HTTP_READ_TIMEOUT", 15))
+)
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 2))
+BACKOFF_BASE = 0.3  # giây, nhân đôi sau mỗi lần retry
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "Connection": "keep-alive"
+}
+
+# Một adapter (một PoolManager, mỗi host một pool) mount chung cho mọi session
+_adapter = HTTPAdapter(
+    pool_connections=int(os.getenv("HTTP_POOL_HOSTS", 32)),
+    pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", 32)),
+    max_retries=0
+)
+
+_lock = threading.Lock()
+_sessions = {}
+_stats = {}
+
+
+def new_session():
+    """Session mới (cookie riêng) nhưng dùng chung connection pool."""
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount("http://", _adapter)
+    session.mount("https://", _adapter)
+    return session
+
+
+def session_for(url):
+    """
+    Session dùng chung theo host cho mọi request/thread. Không lưu cookie: cookie server trả về cho
+    một request không được gửi kèm request của người khác. Cần giữ cookie thì dùng new_session().
+    """
+    host = urlsplit(url).netloc
+    session = _sessions.get(host)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = new_session()
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                _sessions[host] = session
+    return session
+
+
+def _record(host, elapsed, status=None, error=False, retried=False):
+    with _lock:
+        s = _stats.setdefault(host, {
+            "requests": 0, "errors": 0, "retries": 0, "total_time": 0.0, "max_time": 0.0, "statuses": {}
+        })
+        s["requests"] += 1
+        s["total_time"] += elapsed
+        s["max_time"] = max(s["max_time"], elapsed)
+        if error:
+            s["errors"] += 1
+        if retried:
+            s["retries"] += 1
+        if status is not None:
+            s["statuses"][str(status)] = s["statuses"].get(str(status), 0) + 1
+
+
+def request(method, url, session=None, retries=None, **kwargs):
+    method = method.upper()
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    session = session or session_for(url)
+    host = urlsplit(url).netloc
+    if retries is None:
+        retries = MAX_RETRIES if method in RETRY_METHODS else 0
+
+    attempt = 0
+    while True:
+        started = time.monotonic()
+        try:
+            res = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            _record(host, time.monotonic() - started, error=True, retried=attempt < retries)
+            if attempt >= retries:
+                raise
+        else:
+            retry = res.status_code in RETRY_STATUSES and attempt < retries
+            _record(host, time.monotonic() - started, status=res.status_code,
+                    error=res.status_code >= 500, retried=retry)
+            if not retry:
+                return res
+            res.close()
+        # Exponential backoff với full jitter để các worker không retry cùng lúc
+        time.sleep(random.uniform(0, BACKOFF_BASE * (2 ** attempt)))
+        attempt += 1
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def head(url, **kwargs):
+    return request("HEAD", url, **kwargs)
+
+
+def _flight_key(url, params, kwargs):
+    """Khoá gộp request đồng thời: URL, params, headers và các tham số khác (session so theo id)."""
+    headers = tuple(sorted((kwargs.get("headers") or {}).items()))
+    others = tuple(sorted(
+        (name, id(value) if name == "session" else repr(value))
+        for name, value in kwargs.items() if name != "headers"
+    ))
+    return (url, tuple(sorted((params or {}).items())), headers, others)
+
+
+def get_text(url, params=None, **kwargs):
+    """GET và trả về text; các lời gọi đồng thời cùng URL/params/headers chỉ gọi upstream một lần."""
+    key = _flight_key(url, params, kwargs)
+    return upstream.do(key, lambda: get(url, params=params, **kwargs).text)
+
+
+def get_region_text(url, region, params=None, chunk_size=16 * 1024, **kwargs):
+    """
+    GET dạng stream và ngừng đọc ngay khi element `region` = (tên thẻ, attrs) đã đóng,
+    phần sau của trang không bao giờ được tải. Trả về đoạn HTML đã nhận (từ đầu trang tới
+    hết element đó), hoặc cả trang nếu không gặp element. Parse tiếp bằng make_soup(region=...).
+    """
+    def fetch():
+        res = get(url, params=params, stream=True, **kwargs)
+        # Decoder tăng dần để ký tự nhiều byte bị cắt giữa 2 chunk vẫn giải mã đúng
+        decoder = codecs.getincrementaldecoder(res.encoding or "utf-8")(errors="replace")
+        tracker = RegionTracker(region)
+        parts = []
+        try:
+            for chunk in res.iter_content(chunk_size):
+                text = decoder.decode(chunk)
+                parts.append(text)
+                tracker.feed(text)
+                if tracker.done:
+                    break
+            else:
+                # Đọc hết body: giải mã nốt phần byte còn lại của ký tự nhiều byte ở cuối
+                parts.append(decoder.decode(b"", final=True))
+        finally:
+            # Body chưa đọc hết thì kết nối bị đóng thay vì trả về pool
+            res.close()
+        return "".join(parts)
+
+    key = ("region", repr(region)) + _flight_key(url, params, kwargs)
+    return upstream.do(key, fetch)
+
+
+def preconnect(url):
+    """Mở sẵn kết nối (TCP + TLS) tới host để nằm trong pool cho request sau."""
+    head(url, allow_redirects=False, retries=0)
+
+
+def stats():
+    with _lock:
+        result = {}
+        for host, s in _stats.items():
+            result[host] = {
+                **s,
+                "statuses": dict(s["statuses"]),
+                "avg_time": round(s["total_time"] / s["requests"], 4) if s["requests"] else 0.0
+            }
+        return result
@@ -0,0 +1,130 @@
+import datetime
+import os
+import traceback
+
+import lottery_schedule
+from lottery_stats import (
+    PROVINCE_TYPES, head_tail_frequency, load_history, lo_gan, pair_cooccurrence, streaks
+)
+
+class LotteryAnalyticsService:
+    service_name = 'lottery_analytics_service'
+    cache_ttl = 1800
+    METRICS = ("lo_gan", "pairs", "head_tail", "streaks")
+    ALL_TYPES = ("all", "Tất cả")
+    # Khoảng mặc định khi không truyền duration.startDate
+    default_days = int(os.getenv("LOTTERY_ANALYTICS_DAYS", 365))
+    max_limit = 100
+
+    def parse_request(self, json_data):
+        """Đọc tham số, trả về (options, lỗi); lỗi là None nếu hợp lệ."""
+        lottery_type = json_data.get("lottery_type") or "Miền Bắc"
+        if isinstance(lottery_type, str):
+            lottery_types = PROVINCE_TYPES if lottery_type in self.ALL_TYPES else [lottery_type]
+        elif isinstance(lottery_type, (list, tuple)) and all(isinstance(t, str) for t in lottery_type):
+            lottery_types = list(lottery_type)
+        else:
+            return None, f"Không hỗ trợ thống kê cho: {lottery_type}."
+        unknown = [t for t in lottery_types if t not in PROVINCE_TYPES]
+        if unknown:
+            return None, f"Không hỗ trợ thống kê cho: {', '.join(unknown)}."
+
+        try:
+            end = json_data.get("duration.endDate", "")
+            end = datetime.datetime.strptime(end, "%d/%m/%Y").date() if end else lottery_schedule.now().date()
+            start = json_data.get("duration.startDate", "")
+            start = (datetime.datetime.strptime(start, "%d/%m/%Y").date() if start
+                     else end - datetime.timedelta(days=self.default_days - 1))
+        except ValueError:
+            return None, "Ngày phải có dạng dd/mm/yyyy."
+        if start > end:
+            return None, "duration.startDate phải trước duration.endDate."
+
+        metrics = json_data.get("metrics") or list(self.METRICS)
+        if isinstance(metrics, str):
+            metrics = [m.strip() for m in metrics.split(",") if m.strip()]
+        unknown = [m for m in metrics if m not in self.METRICS]
+        if unknown:
+            return None, f"metrics phải thuộc: {', '.join(self.METRICS)}."
+
+        number = json_data.get("number")
+        try:
+            limit = min(int(json_data.get("limit", 10)), self.max_limit)
+            number = int(number) if number not in (None, "") else None
+        except (TypeError, ValueError):
+            return None, "limit và number phải là số."
+        if limit < 1:
+            return None, "limit phải lớn hơn hoặc bằng 1."
+        if number is not None and not 0 <= number <= 99:
+            return None, "number phải từ 00 đến 99."
+
+        return {
+            "lottery_types": lottery_types,
+            "start": start,
+            "end": end,
+            "metrics": metrics,
+            "limit": limit,
+            "number": number
+        }, None
+
+    def analyze(self, lottery_type, options):
+        history = load_history(lottery_type, options["start"], options["end"])
+        result = {"draws": len(history)}
+        if "lo_gan" in options["metrics"]:
+            result["lo_gan"] = lo_gan(history, options["limit"])
+        if "pairs" in options["metrics"]:
+            result["pairs"] = pair_cooccurrence(history, options["limit"], options["number"])
+        if "head_tail" in options["metrics"]:
+            result["head_tail"] = head_tail_frequency(history)
+        if "streaks" in options["metrics"]:
+            result["streaks"] = streaks(history, options["limit"])
+        return result
+
+    def format_context(self, lottery_type, stats):
+        lines = [f"{lottery_type}: {stats['draws']} kỳ quay."]
+        if stats["draws"] == 0:
+            return lines[0] + " Chưa có dữ liệu trong khoảng này."
+        if stats.get("lo_gan"):
+            lines.append("Lô gan: " + ", ".join(
+                f"{item['so']} ({item['gan']} kỳ)" for item in stats["lo_gan"]))
+        if stats.get("pairs"):
+            lines.append("Cặp hay về cùng nhau: " + ", ".join(
+                f"{'-'.join(item['pair'])} ({item['count']} lần)" for item in stats["pairs"]))
+        if stats.get("head_tail"):
+            head_tail = stats["head_tail"]
+            lines.append("Đầu: " + ", ".join(f"{d}: {c}" for d, c in head_tail["dau"].items()))
+            lines.append("Đuôi: " + ", ".join(f"{d}: {c}" for d, c in head_tail["duoi"].items()))
+        if stats.get("streaks"):
+            lines.append("Lô về liên tiếp: " + ", ".join(
+                f"{item['so']} (đang {item['current']} kỳ, dài nhất {item['longest']} kỳ)"
+                for item in stats["streaks"]))
+        return "\n".join(lines)
+
+    def process(self, json_data, log):
+        """
+        Thống kê lô gan, cặp số hay về cùng nhau, tần suất đầu/đuôi và chuỗi về liên tiếp
+        trên lịch sử kết quả đã lưu, cho một hoặc nhiều tỉnh trong khoảng ngày tuỳ chọn.
+        """
+        response = {"message": "Success", "status": 200}
+        try:
+            options, error = self.parse_request(json_data)
+            if error:
+                response.update({"message": error, "status": 400})
+                return response
+
+            log.debug(f"Lottery analytics {options['lottery_types']} {options['start']} -> {options['end']}")
+            provinces = {t: self.analyze(t, options) for t in options["lottery_types"]}
+            response["result"] = {
+                "start": options["start"].strftime("%d/%m/%Y"),
+                "end": options["end"].strftime("%d/%m/%Y"),
+                "provinces": provinces
+            }
+            response["formatted_context"] = "\n\n".join(
+                self.format_context(t, stats) for t, stats in provinces.items())
+
+        except Exception as e:
+            traceback.print_exc()
+            response["message"] = str(e)
+            response["status"] = 500
+
+        return response
@@ -0,0 +1,227 @@
+# lottery_backfill.py
+# Tải lịch sử kết quả xổ số vào lottery_store cho mọi loại trong LotteryService.LOTTERY_TYPES.
+#
+#   python lottery_backfill.py --start 01/01/2020                      # tất cả loại, tới hôm qua
+#   python lottery_backfill.py --start 01/01/2023 --types "Miền Bắc,Cà Mau" --workers 4 --rate 2
+#
+# Chạy lại lệnh cũ sẽ tiếp tục từ chỗ dừng: kỳ đã có trong kho được bỏ qua, ngày không có kỳ quay
+# được ghi vào file checkpoint để không phải hỏi lại. Ngày mà lịch quay (lottery_schedule) cho biết
+# tỉnh đó không quay thì không tải.
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import lottery_schedule
+from lottery_service import LotteryService
+from lottery_store import lottery_store
+
+log = logging.getLogger("lottery_backfill")
+
+
+class HostRateLimiter:
+    """Giới hạn số request/giây tới mỗi host, dùng chung cho mọi worker."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Checkpoint:
+    """Các (loại, ngày) đã tải mà không có kỳ quay, lưu ra file JSON để chạy lại không phải tải lại."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.empty = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.empty = {k: set(v) for k, v in json.load(f).get("empty", {}).items()}
+
+    def is_empty(self, lottery_type, draw_date):
+        return draw_date.isoformat() in self.empty.get(lottery_type, ())
+
+    def mark_empty(self, lottery_type, draw_date):
+        with self._lock:
+            self.empty.setdefault(lottery_type, set()).add(draw_date.isoformat())
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {"empty": {k: sorted(v) for k, v in self.empty.items()}}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class Progress:
+    def __init__(self, total, report_every):
+        self.total = total
+        self.report_every = report_every
+        self.counts = {"stored": 0, "empty": 0, "failed": 0}
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    def add(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+            now = time.monotonic()
+            if now - self._last_report >= self.report_every:
+                self._last_report = now
+                self.report()
+
+    def report(self):
+        done = sum(self.counts.values())
+        elapsed = time.monotonic() - self.started
+        rate = done / elapsed if elapsed else 0.0
+        eta = (self.total - done) / rate if rate else 0.0
+        print(f"[{done}/{self.total}] stored={self.counts['stored']} empty={self.counts['empty']} "
+              f"failed={self.counts['failed']} {rate:.1f} req/s, eta {eta / 60:.1f} phút", flush=True)
+
+
+def date_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def pending_tasks(lottery_types, start, end, checkpoint):
+    """
+    Các (loại, ngày) có kỳ quay theo lịch, chưa có trong kho và chưa biết là không có kỳ quay,
+    mới nhất trước.
+    """
+    tasks = []
+    for lottery_type in lottery_types:
+        stored = lottery_store.dates(lottery_type)
+        for day in date_range(start, end):
+            if not lottery_schedule.draws_on(lottery_type, day):
+                continue
+            if day not in stored and not checkpoint.is_empty(lottery_type, day):
+                tasks.append((lottery_type, day))
+    tasks.sort(key=lambda task: task[1], reverse=True)
+    return tasks
+
+
+def backfill_one(lottery_type, draw_date, limiter, retries=2):
+    search_url = LotteryService.get_search_url(lottery_type, draw_date)
+    for attempt in range(retries + 1):
+        limiter.wait(search_url)
+        try:
+            # Tắt retry bên trong http_client: mọi lần thử đều đi qua limiter ở vòng lặp này
+            draw = LotteryService.fetch_draw(lottery_type, search_url, retries=0)
+            break
+        except Exception as e:
+            if attempt == retries:
+                log.warning("Failed %s %s: %s", lottery_type, draw_date, e)
+                return "failed"
+    if not draw["result"]:
+        # Trang chặn, trang lỗi hoặc parse không ra bảng kết quả: lần chạy sau thử lại
+        log.warning("No result table for %s %s", lottery_type, draw_date)
+        return "failed"
+    shown_date = LotteryService.parse_draw_date(draw)
+    if shown_date is not None and shown_date != draw_date:
+        # Bảng kết quả của kỳ khác: ngày đó thật sự không có kỳ quay, ghi checkpoint
+        return "empty"
+    if LotteryService.save_draw(lottery_type, draw_date, draw, search_url, log):
+        return "stored"
+    log.warning("Result for %s %s not stored (incomplete or missing date)", lottery_type, draw_date)
+    return "failed"
+
+
+def run(lottery_types, start, end, workers, rate, checkpoint_path, report_every=10, checkpoint_every=200):
+    checkpoint = Checkpoint(checkpoint_path)
+    tasks = pending_tasks(lottery_types, start, end, checkpoint)
+    print(f"{len(tasks)} kỳ cần tải cho {len(lottery_types)} loại xổ số, {start} -> {end}", flush=True)
+    limiter = HostRateLimiter(rate)
+    progress = Progress(len(tasks), report_every)
+
+    # Chỉ giữ tối đa 2 * workers task đang chờ để Ctrl-C dừng nhanh và không giữ hàng nghìn future
+    pending = set()
+    task_iter = iter(tasks)
+    processed = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backfill") as executor:
+        try:
+            while True:
+                while len(pending) < workers * 2:
+                    task = next(task_iter, None)
+                    if task is None:
+                        break
+                    future = executor.submit(backfill_one, task[0], task[1], limiter)
+                    future.task = task
+                    pending.add(future)
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    outcome = future.result()
+                    if outcome == "empty":
+                        checkpoint.mark_empty(*future.task)
+                    progress.add(outcome)
+                    processed += 1
+                    if processed % checkpoint_every == 0:
+                        checkpoint.save()
+        except KeyboardInterrupt:
+            print("Đang dừng, lưu checkpoint...", flush=True)
+            for future in pending:
+                future.cancel()
+            raise
+        finally:
+            checkpoint.save()
+    progress.report()
+    return progress.counts
+
+
+def parse_date(value):
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"Ngày không hợp lệ: {value} (dd/mm/yyyy hoặc yyyy-mm-dd)")
+
+
+def main():
+    yesterday = lottery_schedule.now().date() - datetime.timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Tải lịch sử kết quả xổ số vào lottery_store")
+    parser.add_argument("--start", type=parse_date, required=True)
+    parser.add_argument("--end", type=parse_date, default=yesterday)
+    parser.add_argument("--types", default="", help="danh sách loại, cách nhau bởi dấu phẩy (mặc định: tất cả)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=4.0, help="số request/giây tối đa tới mỗi host")
+    parser.add_argument("--checkpoint", default="lottery_backfill.checkpoint.json")
+    parser.add_argument("--report-every", type=float, default=10.0, help="giây giữa 2 lần in tiến độ")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    lottery_types = [t.strip() for t in args.types.split(",") if t.strip()] or list(LotteryService.LOTTERY_TYPES)
+    unknown = [t for t in lottery_types if t not in LotteryService.LOTTERY_TYPES]
+    if unknown:
+        parser.error(f"Loại xổ số không có trong LotteryService.LOTTERY_TYPES: {', '.join(unknown)}")
+    run(lottery_types, args.start, min(args.end, yesterday), args.workers, args.rate,
+        args.checkpoint, report_every=args.report_every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# lottery_live.py
+# Trong giờ quay, một thread nền duy nhất tải kết quả các kỳ đang quay theo chu kỳ; mọi request
+# đọc bản mới nhất trong bộ nhớ thay vì tự gọi kqxs.vn.
+
+import logging
+import os
+import threading
+import time
+
+import lottery_schedule
+
+log = logging.getLogger(__name__)
+
+
+class LiveDrawPoller:
+    # Khoảng cách (giây) giữa 2 lần tải một kỳ đang quay
+    interval = float(os.getenv("LOTTERY_LIVE_POLL_INTERVAL", 10))
+    # Thời gian tối đa request đầu tiên đợi bản kết quả đầu tiên của poller
+    first_snapshot_timeout = float(os.getenv("LOTTERY_LIVE_FIRST_TIMEOUT", 15))
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # lottery_type -> ngày quay đang theo dõi
+        self._watching = {}
+        # (lottery_type, ngày) -> {"draw", "search_url", "updated_at"}
+        self._snapshots = {}
+        self._thread = None
+
+    def snapshot(self, lottery_type, day):
+        """
+        Bản kết quả mới nhất của kỳ (lottery_type, day) đang quay. Kỳ chưa được theo dõi thì đăng ký
+        với poller và đợi lần tải đầu tiên; None nếu poller chưa tải được gì.
+        """
+        key = (lottery_type, day)
+        with self._cond:
+            if key not in self._snapshots:
+                self._watching[lottery_type] = day
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="lottery-live-poller", daemon=True)
+                    self._thread.start()
+                self._cond.wait_for(lambda: key in self._snapshots, self.first_snapshot_timeout)
+            return self._snapshots.get(key)
+
+    def _poll(self, lottery_type, day):
+        """Tải kỳ đang quay một lần, trả về True nếu không cần theo dõi tiếp."""
+        from lottery_service import LotteryService
+        search_url = LotteryService.get_search_url(lottery_type, day)
+        try:
+            # fetch_draw ngừng tải ngay khi bảng kết quả đóng nên mỗi lần poll chỉ tốn phần đầu trang
+            draw = LotteryService.fetch_draw(lottery_type, search_url)
+        except Exception as e:
+            log.warning("Live poll %s %s failed: %s", lottery_type, day, e)
+            return lottery_schedule.phase(lottery_type, day) == "finished"
+        # Chưa quay giải nào thì trang hiển thị kỳ trước, không được coi là kết quả đang quay
+        if LotteryService.parse_draw_date(draw) not in (None, day):
+            draw = {**draw, "result": None, "table_result": None}
+        with self._cond:
+            self._snapshots[(lottery_type, day)] = {
+                "draw": draw,
+                "search_url": search_url,
+                "updated_at": time.time()
+            }
+            self._cond.notify_all()
+        # Đủ kết quả thì lưu vào kho, từ đó request đọc từ kho và cache lâu dài
+        if draw["result"] and LotteryService.save_draw(lottery_type, day, draw, search_url, log):
+            return True
+        return lottery_schedule.phase(lottery_type, day) == "finished"
+
+    def _run(self):
+        while True:
+            with self._cond:
+                watching = list(self._watching.items())
+                if not watching:
+                    self._thread = None
+                    # Bản của các kỳ đã xong không còn được đọc (request đã chuyển sang kho)
+                    self._snapshots.clear()
+                    return
+            started = time.monotonic()
+            for lottery_type, day in watching:
+                if self._poll(lottery_type, day):
+                    with self._cond:
+                        if self._watching.get(lottery_type) == day:
+                            del self._watching[lottery_type]
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def stats(self):
+        with self._cond:
+            return {
+                "running": self._thread is not None,
+                "watching": {t: d.isoformat() for t, d in self._watching.items()},
+                "snapshots": len(self._snapshots)
+            }
+
+
+live_poller = LiveDrawPoller()
@@ -0,0 +1,119 @@
+# lottery_schedule.py
+# Lịch quay số cố định của xổ số kiến thiết và Vietlott (giờ Việt Nam), dùng để biết một kỳ quay
+# chưa diễn ra, đang quay hay đã có kết quả cuối cùng.
+
+import datetime
+import os
+
+VN_TZ = datetime.timezone(datetime.timedelta(hours=7))
+
+# Khung giờ quay (bắt đầu, kết thúc) theo miền, đã tính dư vài phút cho trang kết quả cập nhật
+DRAW_WINDOWS = {
+    "Miền Nam": (datetime.time(16, 15), datetime.time(16, 45)),
+    "Miền Trung": (datetime.time(17, 15), datetime.time(17, 45)),
+    "Miền Bắc": (datetime.time(18, 15), datetime.time(18, 45)),
+    "Vietlott": (datetime.time(18, 0), datetime.time(18, 30)),
+}
+# Sau giờ kết thúc vẫn coi là đang quay thêm một lúc nếu kết quả chưa đủ (quay trễ, trang cập nhật chậm)
+LIVE_GRACE = datetime.timedelta(minutes=int(os.getenv("LOTTERY_LIVE_GRACE_MINUTES", 30)))
+
+# Ngày quay trong tuần của từng tỉnh (0 = thứ Hai ... 6 = Chủ nhật); Miền Bắc và kết quả gộp
+# Miền Nam/Miền Trung quay hằng ngày
+WEEKLY_DRAWS = {
+    "Hồ Chí Minh": (0, 5),
+    "Đồng Tháp": (0,),
+    "Cà Mau": (0,),
+    "Bến Tre": (1,),
+    "Vũng Tàu": (1,),
+    "Bạc Liêu": (1,),
+    "Đồng Nai": (2,),
+    "Cần Thơ": (2,),
+    "Sóc Trăng": (2,),
+    "Tây Ninh": (3,),
+    "An Giang": (3,),
+    "Bình Thuận": (3,),
+    "Vĩnh Long": (4,),
+    "Bình Dương": (4,),
+    "Trà Vinh": (4,),
+    "Long An": (5,),
+    "Bình Phước": (5,),
+    "Hậu Giang": (5,),
+    "Tiền Giang": (6,),
+    "Kiên Giang": (6,),
+    "Đà Lạt": (6,),
+    "Phú Yên": (0,),
+    "Thừa Thiên Huế": (0, 6),
+    "Đắk Lắk": (1,),
+    "Quảng Nam": (1,),
+    "Đà Nẵng": (2, 5),
+    "Khánh Hòa": (2, 6),
+    "Bình Định": (3,),
+    "Quảng Trị": (3,),
+    "Quảng Bình": (3,),
+    "Gia Lai": (4,),
+    "Ninh Thuận": (4,),
+    "Quảng Ngãi": (5,),
+    "Đắk Nông": (5,),
+    "Kon Tum": (6,),
+    "Mega 6/45": (2, 4, 6),
+    "Power 6/55": (1, 3, 5),
+}
+
+
+def now():
+    return datetime.datetime.now(VN_TZ)
+
+
+def region_of(lottery_type):
+    # Import lúc gọi: lottery_service dùng module này để tính thời gian cache
+    from lottery_service import LotteryService
+    path = LotteryService.LOTTERY_TYPES[lottery_type]
+    if path.startswith("/mien-nam"):
+        return "Miền Nam"
+    if path.startswith("/mien-trung"):
+        return "Miền Trung"
+    if path.startswith("/mien-bac"):
+        return "Miền Bắc"
+    return "Vietlott"
+
+
+def draws_on(lottery_type, day):
+    weekdays = WEEKLY_DRAWS.get(lottery_type)
+    return weekdays is None or day.weekday() in weekdays
+
+
+def draw_window(lottery_type, day):
+    """(bắt đầu, kết thúc) của kỳ quay ngày day, None nếu hôm đó loại này không quay."""
+    if not draws_on(lottery_type, day):
+        return None
+    start, end = DRAW_WINDOWS[region_of(lottery_type)]
+    return (datetime.datetime.combine(day, start, tzinfo=VN_TZ),
+            datetime.datetime.combine(day, end, tzinfo=VN_TZ))
+
+
+def phase(lottery_type, day, at=None):
+    """
+    Trạng thái kỳ quay ngày day: "no_draw" (hôm đó không quay), "before" (chưa quay),
+    "live" (đang quay, kể cả LIVE_GRACE sau giờ kết thúc) hoặc "finished".
+    """
+    at = at or now()
+    window = draw_window(lottery_type, day)
+    if window is None:
+        return "no_draw"
+    if at < window[0]:
+        return "before"
+    if at <= window[1] + LIVE_GRACE:
+        return "live"
+    return "finished"
+
+
+def next_draw(lottery_type, at=None):
+    """Thời điểm bắt đầu kỳ quay kế tiếp chưa kết thúc (kỳ đang quay thì trả về kỳ đó)."""
+    at = at or now()
+    day = at.date()
+    for _ in range(8):
+        window = draw_window(lottery_type, day)
+        if window is not None and window[1] >= at:
+            return window[0]
+        day += datetime.timedelta(days=1)
+    return None
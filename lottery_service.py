@@ -1,62 +1,142 @@
 import json
 import traceback
 import datetime
-import requests
-from bs4 import BeautifulSoup
+import http_client
+from html_parser import make_soup
 import re
+import unicodedata
+from html import escape
 
 from common_service import CommonService
+import lottery_schedule
+from lottery_live import live_poller
+from lottery_store import lottery_store
 
 
 class LotteryService(CommonService):
     service_name = 'lottery_service'
+    warm_up_urls = ['https://kqxs.vn']
+    RESULT_TABLE = ("table", {"class": "table-fixed tbldata table-result-lottery"})
+    # Nhãn giải trên bảng kết quả của kqxs.vn -> key của parse_lottery_table
+    PRIZE_LABELS = {
+        "Đặc biệt": "giai_dac_biet",
+        "Giải nhất": "giai_nhat",
+        "Giải nhì": "giai_nhi",
+        "Giải ba": "giai_ba",
+        "Giải tư": "giai_tu",
+        "Giải năm": "giai_nam",
+        "Giải sáu": "giai_sau",
+        "Giải bảy": "giai_bay",
+        "Giải tám": "giai_tam"
+    }
+    # Tên tỉnh hay được viết tắt/viết khác trên tiêu đề cột của bảng kết quả cả miền
+    PROVINCE_ALIASES = {
+        "Hồ Chí Minh": ("TP.HCM", "TP. Hồ Chí Minh", "HCM", "Thành phố Hồ Chí Minh"),
+        "Thừa Thiên Huế": ("Huế", "TT Huế", "Thừa T. Huế"),
+        "Vũng Tàu": ("Bà Rịa Vũng Tàu", "BR-VT"),
+        "Đà Lạt": ("Lâm Đồng",),
+        "Đắk Lắk": ("Đắc Lắc", "Daklak"),
+        "Đắk Nông": ("Đắc Nông", "Daknong"),
+        "Khánh Hòa": ("Khánh Hoà",),
+    }
+    # Tên hiển thị các giải theo key của parse_lottery_table, từ giải cao xuống thấp
+    PRIZE_NAMES = {
+        "giai_dac_biet": "Giải đặc biệt",
+        "giai_nhat": "Giải nhất",
+        "giai_nhi": "Giải nhì",
+        "giai_ba": "Giải ba",
+        "giai_tu": "Giải tư",
+        "giai_nam": "Giải năm",
+        "giai_sau": "Giải sáu",
+        "giai_bay": "Giải bảy",
+        "giai_tam": "Giải tám"
+    }
+    LOTTERY_URL = 'https://kqxs.vn'
+    # Kết quả của kỳ đã quay xong không bao giờ đổi
+    FOREVER_TTL = 10 * 365 * 24 * 3600
+    LOTTERY_TYPES = {
+        "Miền Bắc": "/mien-bac",
+        "Miền Trung": "/mien-trung",
+        "Miền Nam": "/mien-nam",
+        "Hồ Chí Minh": "/mien-nam/xo-so-ho-chi-minh",
+        "Đồng Tháp": "/mien-nam/xo-so-dong-thap",
+        "Cà Mau": "/mien-nam/xo-so-ca-mau",
+        "Bến Tre": "/mien-nam/xo-so-ben-tre",
+        "Vũng Tàu": "/mien-nam/xo-so-vung-tau",
+        "Bạc Liêu": "/mien-nam/xo-so-bac-lieu",
+        "Đồng Nai": "/mien-nam/xo-so-dong-nai",
+        "Cần Thơ": "/mien-nam/xo-so-can-tho",
+        "Sóc Trăng": "/mien-nam/xo-so-soc-trang",
+        "Tây Ninh": "/mien-nam/xo-so-tay-ninh",
+        "An Giang": "/mien-nam/xo-so-an-giang",
+        "Bình Thuận": "/mien-nam/xo-so-binh-thuan",
+        "Vĩnh Long": "/mien-nam/xo-so-vinh-long",
+        "Bình Dương": "/mien-nam/xo-so-binh-duong",
+        "Trà Vinh": "/mien-nam/xo-so-tra-vinh",
+        "Long An": "/mien-nam/xo-so-long-an",
+        "Bình Phước": "/mien-nam/xo-so-binh-phuoc",
+        "Hậu Giang": "/mien-nam/xo-so-hau-giang",
+        "Tiền Giang": "/mien-nam/xo-so-tien-giang",
+        "Kiên Giang": "/mien-nam/xo-so-kien-giang",
+        "Đà Lạt": "/mien-nam/xo-so-da-lat",
+        "Phú Yên": "/mien-trung/xo-so-phu-yen",
+        "Thừa Thiên Huế": "/mien-trung/xo-so-thua-thien-hue",
+        "Đắk Lắk": "/mien-trung/xo-so-dac-lac",
+        "Quảng Nam": "/mien-trung/xo-so-quang-nam",
+        "Đà Nẵng": "/mien-trung/xo-so-da-nang",
+        "Khánh Hòa": "/mien-trung/xo-so-khanh-hoa",
+        "Quảng Bình": "/mien-trung/xo-so-quang-binh",
+        "Bình Định": "/mien-trung/xo-so-binh-dinh",
+        "Quảng Trị": "/mien-trung/xo-so-quang-tri",
+        "Gia Lai": "/mien-trung/xo-so-gia-lai",
+        "Ninh Thuận": "/mien-trung/xo-so-ninh-thuan",
+        "Quảng Ngãi": "/mien-trung/xo-so-quang-ngai",
+        "Đắk Nông": "/mien-trung/xo-so-dac-nong",
+        "Kon Tum": "/mien-trung/xo-so-kon-tum",
+        "Mega 6/45": "/xo-so-mega645",
+        "Power 6/55": "/xo-so-power655",
+    }
     
     def __init__(self):
         super(LotteryService, self).__init__()
-        self.lottery_url = 'https://kqxs.vn'
-        self.lottery_types = {
-            "Miền Bắc": "/mien-bac",
-            "Miền Trung": "/mien-trung",
-            "Miền Nam": "/mien-nam",
-            "Hồ Chí Minh": "/mien-nam/xo-so-ho-chi-minh",
-            "Đồng Tháp": "/mien-nam/xo-so-dong-thap",
-            "Cà Mau": "/mien-nam/xo-so-ca-mau",
-            "Bến Tre": "/mien-nam/xo-so-ben-tre",
-            "Vũng Tàu": "/mien-nam/xo-so-vung-tau",
-            "Bạc Liêu": "/mien-nam/xo-so-bac-lieu",
-            "Đồng Nai": "/mien-nam/xo-so-dong-nai",
-            "Cần Thơ": "/mien-nam/xo-so-can-tho",
-            "Sóc Trăng": "/mien-nam/xo-so-soc-trang",
-            "Tây Ninh": "/mien-nam/xo-so-tay-ninh",
-            "An Giang": "/mien-nam/xo-so-an-giang",
-            "Bình Thuận": "/mien-nam/xo-so-binh-thuan",
-            "Vĩnh Long": "/mien-nam/xo-so-vinh-long",
-            "Bình Dương": "/mien-nam/xo-so-binh-duong",
-            "Trà Vinh": "/mien-nam/xo-so-tra-vinh",
-            "Long An": "/mien-nam/xo-so-long-an",
-            "Bình Phước": "/mien-nam/xo-so-binh-phuoc",
-            "Hậu Giang": "/mien-nam/xo-so-hau-giang",
-            "Tiền Giang": "/mien-nam/xo-so-tien-giang",
-            "Kiên Giang": "/mien-nam/xo-so-kien-giang",
-            "Đà Lạt": "/mien-nam/xo-so-da-lat",
-            "Phú Yên": "/mien-trung/xo-so-phu-yen",
-            "Thừa Thiên Huế": "/mien-trung/xo-so-thua-thien-hue",
-            "Đắk Lắk": "/mien-trung/xo-so-dac-lac",
-            "Quảng Nam": "/mien-trung/xo-so-quang-nam",
-            "Đà Nẵng": "/mien-trung/xo-so-da-nang",
-            "Khánh Hòa": "/mien-trung/xo-so-khanh-hoa",
-            "Quảng Bình": "/mien-trung/xo-so-quang-binh",
-            "Bình Định": "/mien-trung/xo-so-binh-dinh",
-            "Quảng Trị": "/mien-trung/xo-so-quang-tri",
-            "Gia Lai": "/mien-trung/xo-so-gia-lai",
-            "Ninh Thuận": "/mien-trung/xo-so-ninh-thuan",
-            "Quảng Ngãi": "/mien-trung/xo-so-quang-ngai",
-            "Đắk Nông": "/mien-trung/xo-so-dac-nong",
-            "Kon Tum": "/mien-trung/xo-so-kon-tum",
-            "Mega 6/45": "/xo-so-mega645",
-            "Power 6/55": "/xo-so-power655",
-        }
+        self.lottery_url = self.LOTTERY_URL
+        self.lottery_types = self.LOTTERY_TYPES
     
+    def get_cache_ttl(self, json_data, response):
+        # Thời gian cache theo lịch quay: kỳ đã xong cache vĩnh viễn, kỳ chưa quay cache tới giờ quay,
+        # trong giờ quay chỉ cache bằng chu kỳ của poller
+        status = response.get("status")
+        lottery_type = json_data.get("lottery_type", "") or "Miền Bắc"
+        if status not in (200, 404) or lottery_type not in self.LOTTERY_TYPES:
+            return 0
+        if response.get("live"):
+            return live_poller.interval
+        now = lottery_schedule.now()
+        duration = json_data.get("duration.startDate", "")
+        if duration:
+            try:
+                draw_date = datetime.datetime.strptime(duration, "%d/%m/%Y").date()
+            except ValueError:
+                return 0
+            phase = lottery_schedule.phase(lottery_type, draw_date, now)
+            if phase == "before":
+                start = lottery_schedule.draw_window(lottery_type, draw_date)[0]
+                return max(1, int((start - now).total_seconds()))
+            if status != 200:
+                return 0
+            if draw_date < now.date() or (phase != "no_draw" and self.is_complete(response["result"])):
+                return self.FOREVER_TTL
+            return 120
+        if status != 200:
+            return 0
+        # Kết quả mới nhất còn đúng cho tới khi kỳ kế tiếp bắt đầu quay
+        next_draw = lottery_schedule.next_draw(lottery_type, now)
+        if next_draw is None:
+            return 120
+        if next_draw <= now:
+            return live_poller.interval
+        return int((next_draw - now).total_seconds())
+
     def process(self, json_data, log):
         response = {
             "message": "Success",
@@ -74,59 +154,43 @@ class LotteryService(CommonService):
             log.debug("Get lottery lottery_type=[{}] duration=[{}]".format(lottery_type, duration))
             
             chosen_lottery = self.lottery_types.get(lottery_type)
-            search_url = self.lottery_url + chosen_lottery
-            
-            if duration:
-                search_date = datetime.datetime.strptime(duration, "%d/%m/%Y").strftime("%d-%m-%Y")
-                search_url = search_url + "?date={}".format(search_date)
-            
-            headers = {"User-Agent": "Mozilla/5.0"}
-            res = requests.get(search_url, headers=headers, verify=False)
-            soup = BeautifulSoup(res.text, "html.parser")
-            table = soup.find("table", class_="table-fixed tbldata table-result-lottery")
+            draw_date = datetime.datetime.strptime(duration, "%d/%m/%Y").date() if duration else None
+            search_url = self.get_search_url(lottery_type, draw_date)
+            response["loai_xo_so"] = lottery_type
+            response["display_type"] = self.get_display_type(chosen_lottery)
+
+            now = lottery_schedule.now()
+            today = now.date()
+            phase = lottery_schedule.phase(lottery_type, draw_date or today, now)
+            response["draw_status"] = phase
+            next_draw = lottery_schedule.next_draw(lottery_type, now)
+            if next_draw is not None:
+                response["next_draw"] = next_draw.strftime("%H:%M %d-%m-%Y")
+
+            # Kỳ chưa quay: trả lời giờ quay ngay, không cần hỏi kqxs.vn
+            if draw_date is not None and draw_date >= today and phase == "before":
+                start = lottery_schedule.draw_window(lottery_type, draw_date)[0]
+                response["message"] = "Kỳ quay ngày {} chưa diễn ra, giờ quay dự kiến {}".format(
+                    draw_date.strftime("%d-%m-%Y"), start.strftime("%H:%M"))
+                response["status"] = 404
+                response["date"] = draw_date.strftime("%d-%m-%Y")
+                response["formatted_context"] = response["message"]
+                return response
+
+            draw, search_url, live = self.current_draw(lottery_type, draw_date, log, now)
+            if draw is None:
+                response["message"] = "Đang cập nhật kết quả, vui lòng thử lại sau ít phút"
+                response["status"] = 503
+                return response
+            if live:
+                response["live"] = True
             
-            if table is not None:
-                if lottery_type == "Miền Bắc":
-                    result = self.parse_lottery_table(table)
-                    if result:
-                        response["result"] = result
-                        response["table_result"] = str(table)
-                    else:
-                        response["message"] = "Không tìm thấy kết quả"
-                        response["status"] = 404
-                elif lottery_type == "Miền Nam":
-                    result = self.parse_lottery_table_mien_nam(table)
-                    if result:
-                        response["result"] = result
-                        response["table_result"] = str(table)
-                    else:
-                        response["message"] = "Không tìm thấy kết quả"
-                        response["status"] = 404
-                elif lottery_type == "Miền Trung":
-                    result = self.parse_lottery_table_mien_trung(table)
-                    if result:
-                        response["result"] = result
-                        response["table_result"] = str(table)
-                    else:
-                        response["message"] = "Không tìm thấy kết quả"
-                        response["status"] = 404
-                elif lottery_type in ["Mega 6/45", "Power 6/55"]:
-                    result = self.parse_lottery_table_mega_power(table)
-                    if result:
-                        response["result"] = result
-                        response["table_result"] = str(table)
-                    else:
-                        response["message"] = "Không tìm thấy kết quả"
-                        response["status"] = 404
-                else:
-                    # Tất cả các tỉnh đều xử lý như miền Bắc
-                    result = self.parse_lottery_table(table)
-                    if result:
-                        response["result"] = result
-                        response["table_result"] = str(table)
-                    else:
-                        response["message"] = "Không tìm thấy kết quả"
-                        response["status"] = 404
+            if draw["result"]:
+                response["result"] = draw["result"]
+                response["table_result"] = draw["table_result"]
+            elif response.get("live"):
+                response["message"] = "Kỳ quay đang diễn ra, chưa có giải nào được công bố"
+                response["status"] = 404
             else:
                 response["message"] = "Không tìm thấy kết quả"
                 response["status"] = 404
@@ -135,19 +199,16 @@ class LotteryService(CommonService):
             title = None
             date_value = None
             if not duration:
-                title, date_value = self.extract_title_and_date_from_table(table)
+                title = draw["title"]
+                # Kết quả đọc từ kho không có caption, ngày lấy theo ngày quay đã lưu
+                date_value = draw.get("date") or (draw["draw_date"].strftime("%d-%m-%Y") if draw.get("draw_date") else None)
             else:
                 # Nếu có duration thì lấy ngày từ duration, còn title thì để None
-                try:
-                    date_value = datetime.datetime.strptime(duration, "%d/%m/%Y").strftime("%d-%m-%Y")
-                except:
-                    date_value = duration
+                date_value = draw_date.strftime("%d-%m-%Y")
             response["date"] = date_value if date_value else ""
             if title:
                 response["title"] = title
-            response["loai_xo_so"] = lottery_type
             response["source"] = search_url
-            response["display_type"] = self.get_display_type(chosen_lottery)
             response["formatted_context"] = self.format_result_context(response.get("result"), lottery_type, title)
         
         except Exception as e:
@@ -157,20 +218,210 @@ class LotteryService(CommonService):
             traceback.print_exc()
         
         return response
-    
+
+    @classmethod
+    def get_parser(cls, lottery_type):
+        if lottery_type == "Miền Nam":
+            return cls.parse_lottery_table_mien_nam
+        if lottery_type == "Miền Trung":
+            return cls.parse_lottery_table_mien_trung
+        if lottery_type in ["Mega 6/45", "Power 6/55"]:
+            return cls.parse_lottery_table_mega_power
+        # Miền Bắc và tất cả các tỉnh đều xử lý như miền Bắc
+        return cls.parse_lottery_table
+
+    @classmethod
+    def get_search_url(cls, lottery_type, draw_date=None):
+        search_url = cls.LOTTERY_URL + cls.LOTTERY_TYPES[lottery_type]
+        if draw_date is not None:
+            search_url = search_url + "?date={}".format(draw_date.strftime("%d-%m-%Y"))
+        return search_url
+
+    @classmethod
+    def fetch_draw(cls, lottery_type, search_url, retries=None):
+        """
+        Tải và parse một trang kết quả: {"result", "table_result", "title", "date"}.
+        retries: số lần http_client tự thử lại (None = mặc định HTTP_MAX_RETRIES).
+        """
+        headers = {"User-Agent": "Mozilla/5.0"}
+        # Nhiều request cùng lúc cho cùng URL (vd: ngay khi quay xong) chỉ gọi kqxs.vn một lần,
+        # ngừng tải trang ngay khi bảng kết quả đã đóng
+        html = http_client.get_region_text(search_url, cls.RESULT_TABLE, headers=headers, verify=False,
+                                           retries=retries)
+        # Chỉ dựng cây cho bảng kết quả, bỏ qua phần còn lại của trang
+        soup = make_soup(html, region=cls.RESULT_TABLE)
+        table = soup.find("table", class_="table-fixed tbldata table-result-lottery")
+        result = cls.get_parser(lottery_type)(table) if table is not None else None
+        title, date_value = cls.extract_title_and_date_from_table(table)
+        return {
+            "result": result or None,
+            "table_result": str(table) if result else None,
+            "title": title,
+            "date": date_value
+        }
+
+    @classmethod
+    def current_draw(cls, lottery_type, draw_date, log, now=None):
+        """
+        (draw, search_url, live) của kỳ draw_date (None = kỳ mới nhất). Trong giờ quay, kỳ hôm nay chưa
+        đủ kết quả chỉ được đọc qua live_poller để poller là nơi duy nhất gọi kqxs.vn: live=True và
+        draw là bản mới nhất của poller, None nếu poller chưa tải được bản nào.
+        """
+        now = now or lottery_schedule.now()
+        today = now.date()
+        if draw_date in (None, today) and lottery_schedule.phase(lottery_type, today, now) == "live":
+            search_url = cls.get_search_url(lottery_type, draw_date)
+            draw = lottery_store.get(lottery_type, today)
+            if draw is not None:
+                return draw, search_url, False
+            snapshot = live_poller.snapshot(lottery_type, today)
+            if snapshot is None:
+                return None, search_url, True
+            return snapshot["draw"], snapshot["search_url"], True
+        draw, search_url = cls.load_draw(lottery_type, draw_date, log)
+        return draw, search_url, False
+
+    @classmethod
+    def load_draw(cls, lottery_type, draw_date, log):
+        """Kết quả một kỳ và URL nguồn: kỳ đã lưu lấy thẳng từ kho, không thì tải rồi lưu."""
+        search_url = cls.get_search_url(lottery_type, draw_date)
+        # Kho chỉ chứa kỳ đã đủ kết quả (kể cả kỳ hôm nay đã quay xong) nên kết quả không đổi
+        if draw_date is not None and draw_date <= lottery_schedule.now().date():
+            draw = lottery_store.get(lottery_type, draw_date)
+            if draw is not None:
+                return draw, search_url
+        # Tỉnh miền Nam/Trung: tách từ bảng kết quả cả miền, một lần tải dùng cho mọi tỉnh quay hôm đó
+        region = cls.get_region(lottery_type)
+        if region is not None and draw_date is not None:
+            draw = cls.province_from_region(lottery_type, region, draw_date, log)
+            if draw is not None:
+                cls.save_draw(lottery_type, draw_date, draw, search_url, log)
+                return draw, search_url
+        draw = cls.fetch_draw(lottery_type, search_url)
+        cls.save_draw(lottery_type, draw_date, draw, search_url, log)
+        return draw, search_url
+
+    @classmethod
+    def get_region(cls, lottery_type):
+        """Miền của một tỉnh ("Miền Nam"/"Miền Trung"), None với Miền Bắc, kết quả cả miền và Vietlott."""
+        path = cls.LOTTERY_TYPES.get(lottery_type, "")
+        for region in ("Miền Nam", "Miền Trung"):
+            if path.startswith(cls.LOTTERY_TYPES[region] + "/"):
+                return region
+        return None
+
     @staticmethod
-    def parse_lottery_table(table):
-        prize_map = {
-            "Đặc biệt": "giai_dac_biet",
-            "Giải nhất": "giai_nhat",
-            "Giải nhì": "giai_nhi",
-            "Giải ba": "giai_ba",
-            "Giải tư": "giai_tu",
-            "Giải năm": "giai_nam",
-            "Giải sáu": "giai_sau",
-            "Giải bảy": "giai_bay",
-            "Giải tám": "giai_tam"
+    def slugify(text):
+        """"TP. Hồ Chí Minh" -> "tphochiminh": bỏ dấu, chữ thường, chỉ giữ chữ và số."""
+        text = unicodedata.normalize("NFD", text.replace("Đ", "D").replace("đ", "d"))
+        return re.sub(r"[^a-z0-9]", "", "".join(c for c in text if not unicodedata.combining(c)).lower())
+
+    @classmethod
+    def province_names(cls, lottery_type):
+        """Các cách viết tên tỉnh có thể gặp ở tiêu đề cột của bảng kết quả cả miền (đã slugify)."""
+        slug = cls.LOTTERY_TYPES[lottery_type].rsplit("/", 1)[-1].replace("xo-so-", "")
+        names = {cls.slugify(lottery_type), cls.slugify(slug)}
+        names.update(cls.slugify(alias) for alias in cls.PROVINCE_ALIASES.get(lottery_type, ()))
+        return names
+
+    @classmethod
+    def find_province(cls, region_result, lottery_type):
+        names = cls.province_names(lottery_type)
+        for province, prizes in region_result.items():
+            if cls.slugify(province) in names:
+                return prizes
+        return None
+
+    @classmethod
+    def province_from_region(cls, lottery_type, region, draw_date, log):
+        """
+        Kết quả của tỉnh trong kỳ draw_date lấy từ bảng cả miền (đã lưu hoặc tải một lần), cùng dạng với
+        parse_lottery_table; None nếu không có bảng miền hoặc hôm đó tỉnh không có trong bảng.
+        """
+        region_draw, _ = cls.load_draw(region, draw_date, log)
+        if not region_draw["result"]:
+            return None
+        shown_date = region_draw.get("draw_date") or cls.parse_draw_date(region_draw)
+        if shown_date is not None and shown_date != draw_date:
+            return None
+        prizes = cls.find_province(region_draw["result"], lottery_type)
+        if not prizes:
+            return None
+        result = {}
+        for key, numbers in prizes.items():
+            result["giai_" + key] = numbers[0] if len(numbers) == 1 else numbers
+        title = "Xổ số {} ngày {}".format(lottery_type, draw_date.strftime("%d-%m-%Y"))
+        return {
+            "result": result,
+            "table_result": cls.build_result_table(result, title),
+            "title": title,
+            "date": draw_date.strftime("%d-%m-%Y")
         }
+
+    @classmethod
+    def build_result_table(cls, result, title):
+        """Bảng HTML cùng cấu trúc bảng kết quả của kqxs.vn (parse_lottery_table đọc lại được)."""
+        labels = {key: label for label, key in cls.PRIZE_LABELS.items()}
+        rows = []
+        for key in cls.PRIZE_NAMES:
+            if key not in result:
+                continue
+            numbers = result[key] if isinstance(result[key], list) else [result[key]]
+            spans = "".join('<span class="number">{}</span>'.format(escape(n)) for n in numbers)
+            rows.append('<tr><td class="prize">{}</td><td class="results">{}</td></tr>'.format(labels[key], spans))
+        return '<table class="table-fixed tbldata table-result-lottery"><caption>{}</caption><tbody>{}</tbody></table>'.format(
+            escape(title), "".join(rows))
+
+    @classmethod
+    def save_draw(cls, lottery_type, draw_date, draw, search_url, log):
+        """Ghi kết quả vào kho (write-through) khi kỳ quay đã có đủ kết quả, trả về True nếu đã lưu."""
+        if not draw["result"]:
+            return False
+        shown_date = cls.parse_draw_date(draw)
+        if draw_date is None:
+            # Trang kết quả mới nhất: ngày quay lấy từ caption của bảng
+            draw_date = shown_date
+        elif shown_date is not None and shown_date != draw_date:
+            # Ngày không có kỳ quay: trang hiển thị kỳ khác, không lưu nhầm ngày
+            return False
+        if draw_date is None:
+            return False
+        # Ngày theo giờ Việt Nam, khớp với lịch quay
+        today = lottery_schedule.now().date()
+        # Kỳ quay hôm nay có thể đang quay dở, chỉ lưu khi đã có đủ các giải
+        if draw_date > today or (draw_date == today and not cls.is_complete(draw["result"])):
+            return False
+        lottery_store.put(lottery_type, draw_date, draw["result"], draw["table_result"], draw["title"], search_url)
+        log.debug("Stored lottery result lottery_type=[{}] date=[{}]".format(lottery_type, draw_date))
+        return True
+
+    @staticmethod
+    def parse_draw_date(draw):
+        try:
+            return datetime.datetime.strptime(draw["date"] or "", "%d-%m-%Y").date()
+        except ValueError:
+            return None
+
+    @classmethod
+    def is_complete(cls, result):
+        """Kết quả đã đủ: có giải đặc biệt (quay cuối cùng) và mọi ô đều đã có số."""
+        if "numbers" in result:
+            numbers = result["numbers"]
+            return len(numbers) >= 6 and all(n.isdigit() for n in numbers)
+        if any(isinstance(v, dict) for v in result.values()):
+            return bool(result) and all(cls.is_complete(prizes) for prizes in result.values())
+        special = result.get("giai_dac_biet") or result.get("dac_biet")
+        if not special:
+            return False
+        for value in result.values():
+            values = value if isinstance(value, list) else [value]
+            if not values or not all(v.isdigit() for v in values):
+                return False
+        return True
+
+    @classmethod
+    def parse_lottery_table(cls, table):
+        prize_map = cls.PRIZE_LABELS
         result = {}
         for row in table.find_all("tr"):
             prize_td = row.find("td", class_="prize")
@@ -350,18 +601,7 @@ class LotteryService(CommonService):
                     lines.append(f"  {label}: {vals}")
         # Nếu là dict các giải (miền Bắc hoặc tỉnh lẻ)
         else:
-            prize_map = {
-                "giai_dac_biet": "Giải đặc biệt",
-                "giai_nhat": "Giải nhất",
-                "giai_nhi": "Giải nhì",
-                "giai_ba": "Giải ba",
-                "giai_tu": "Giải tư",
-                "giai_nam": "Giải năm",
-                "giai_sau": "Giải sáu",
-                "giai_bay": "Giải bảy",
-                "giai_tam": "Giải tám"
-            }
-            for key, label in prize_map.items():
+            for key, label in LotteryService.PRIZE_NAMES.items():
                 if key in result:
                     val = result[key]
                     if isinstance(val, list):
@@ -369,7 +609,8 @@ class LotteryService(CommonService):
                     lines.append(f"{label}: {val}")
         return "\n".join(lines)
 
-    def extract_title_and_date_from_table(self, table):
+    @staticmethod
+    def extract_title_and_date_from_table(table):
         # Lấy tiêu đề đầy đủ và ngày từ caption hoặc thead
         title = None
         date_str = None
@@ -0,0 +1,254 @@
+# lottery_stats.py
+# Thống kê lô tô (2 số cuối 00-99) tính trực tiếp từ lịch sử trong lottery_store bằng NumPy,
+# không phải cào các trang thống kê của kqxs.vn.
+
+import threading
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from lottery_service import LotteryService
+from lottery_store import lottery_store
+
+TAILS = 100
+# Thứ tự giải cho kết quả một đài (Miền Bắc) và từng tỉnh trong kết quả Miền Nam/Trung
+PRIZE_KEYS = [
+    "giai_dac_biet", "giai_nhat", "giai_nhi", "giai_ba", "giai_tu",
+    "giai_nam", "giai_sau", "giai_bay", "giai_tam"
+]
+PROVINCE_PRIZE_KEYS = ["dac_biet", "nhat", "nhi", "ba", "tu", "nam", "sau", "bay", "tam"]
+SPECIAL_PRIZE = 0
+# Mọi cặp (a, b) với a < b trong 00-99
+PAIR_ROWS, PAIR_COLS = np.triu_indices(TAILS, k=1)
+# Loại có một bộ kết quả mỗi kỳ (Miền Bắc và từng tỉnh), bỏ kết quả gộp nhiều tỉnh và Vietlott
+PROVINCE_TYPES = [
+    name for name in LotteryService.LOTTERY_TYPES
+    if name not in ("Miền Trung", "Miền Nam", "Mega 6/45", "Power 6/55")
+]
+
+
+def draw_numbers(result):
+    """[(chỉ số giải theo PRIZE_KEYS, số)] của một kỳ quay; kết quả nhiều tỉnh thì gộp mọi tỉnh."""
+    numbers = []
+    if not result or "numbers" in result:
+        return numbers
+    if any(isinstance(value, dict) for value in result.values()):
+        for prizes in result.values():
+            numbers.extend(draw_numbers(prizes))
+        return numbers
+    for key, value in result.items():
+        if key in PRIZE_KEYS:
+            prize = PRIZE_KEYS.index(key)
+        elif key in PROVINCE_PRIZE_KEYS:
+            prize = PROVINCE_PRIZE_KEYS.index(key)
+        else:
+            continue
+        for number in (value if isinstance(value, list) else [value]):
+            if number and number.isdigit():
+                numbers.append((prize, number))
+    return numbers
+
+
+class TailHistory:
+    """
+    Lịch sử các kỳ quay dưới dạng mảng phẳng: mỗi phần tử là một số đã về,
+    draw[i] là chỉ số kỳ (theo dates), prize[i] là chỉ số giải, tail[i] là 2 số cuối.
+    """
+
+    def __init__(self, dates, draw, prize, tail):
+        self.dates = dates
+        self.draw = draw
+        self.prize = prize
+        self.tail = tail
+        self._presence = None
+        # (lịch sử gốc, lo, hi) nếu đây là một khoảng cắt từ lịch sử gốc bằng between()
+        self._window = None
+
+    @classmethod
+    def from_draws(cls, draws):
+        draw_idx, prize_idx, tails = [], [], []
+        for i, d in enumerate(draws):
+            for prize, number in draw_numbers(d["result"]):
+                draw_idx.append(i)
+                prize_idx.append(prize)
+                tails.append(int(number[-2:]))
+        return cls(
+            [d["draw_date"] for d in draws],
+            np.asarray(draw_idx, dtype=np.int32),
+            np.asarray(prize_idx, dtype=np.int8),
+            np.asarray(tails, dtype=np.int16)
+        )
+
+    def between(self, start=None, end=None):
+        """Các kỳ trong [start, end] (dates đã sắp xếp nên chỉ cần cắt theo vị trí)."""
+        lo = bisect_left(self.dates, start) if start is not None else 0
+        hi = bisect_right(self.dates, end) if end is not None else len(self.dates)
+        mask = (self.draw >= lo) & (self.draw < hi)
+        window = TailHistory(self.dates[lo:hi], self.draw[mask] - lo, self.prize[mask], self.tail[mask])
+        window._window = (self, lo, hi)
+        return window
+
+    def __len__(self):
+        return len(self.dates)
+
+    def counts(self):
+        """Ma trận (số kỳ, 100): số lần mỗi cặp số về trong từng kỳ."""
+        flat = self.draw.astype(np.int64) * TAILS + self.tail
+        return np.bincount(flat, minlength=len(self.dates) * TAILS).reshape(len(self.dates), TAILS)
+
+    def prize_counts(self):
+        """Ma trận (số giải, 100): số lần mỗi cặp số về ở từng giải trong cả khoảng."""
+        flat = self.prize.astype(np.int64) * TAILS + self.tail
+        return np.bincount(flat, minlength=len(PRIZE_KEYS) * TAILS).reshape(len(PRIZE_KEYS), TAILS)
+
+    def presence(self):
+        """
+        Ma trận bool (số kỳ, 100): cặp số có về trong kỳ đó hay không, chỉ đọc. Khoảng cắt bằng
+        between() dùng lại (view) ma trận của lịch sử gốc, nên mỗi loại xổ số chỉ tính một lần.
+        """
+        if self._presence is None and self._window is not None:
+            parent, lo, hi = self._window
+            self._presence = parent.presence()[lo:hi]
+        if self._presence is None:
+            present = np.zeros((len(self.dates), TAILS), dtype=bool)
+            present[self.draw, self.tail] = True
+            present.flags.writeable = False
+            self._presence = present
+        return self._presence
+
+    def specials(self):
+        """2 số cuối giải đặc biệt của từng kỳ, -1 nếu kỳ đó thiếu giải đặc biệt."""
+        specials = np.full(len(self.dates), -1, dtype=np.int16)
+        mask = self.prize == SPECIAL_PRIZE
+        specials[self.draw[mask]] = self.tail[mask]
+        return specials
+
+
+_history_cache = {}
+_history_lock = threading.Lock()
+
+
+def load_history(lottery_type, start=None, end=None):
+    """
+    Lịch sử của một loại xổ số trong [start, end]. Toàn bộ lịch sử chỉ được đọc và đổi sang mảng
+    một lần, đọc lại khi kho có kỳ mới.
+    """
+    version = lottery_store.version(lottery_type)
+    with _history_lock:
+        cached = _history_cache.get(lottery_type)
+    if cached is None or cached[0] != version:
+        cached = (version, TailHistory.from_draws(lottery_store.history(lottery_type)))
+        with _history_lock:
+            _history_cache[lottery_type] = cached
+    history = cached[1]
+    if start is None and end is None:
+        return history
+    return history.between(start, end)
+
+
+def appearance_stats(history):
+    """
+    {"00".."99": {"count", "dates"}}: số lần về và các ngày về (mới nhất trước) của mỗi cặp số,
+    đủ 100 số kể cả số chưa về lần nào (giống bảng thống kê 00-99 của kqxs.vn).
+    """
+    counts = history.counts()
+    totals = counts.sum(axis=0)
+    result = {}
+    for tail in range(TAILS):
+        days = np.flatnonzero(counts[:, tail])[::-1]
+        result[f"{tail:02d}"] = {
+            "count": int(totals[tail]),
+            "dates": [history.dates[i].strftime("%d/%m/%Y") for i in days]
+        }
+    return result
+
+
+def special_after_stats(history):
+    """
+    Giải ĐB ngày mai: với 2 số cuối giải đặc biệt của kỳ mới nhất, đếm 2 số cuối giải đặc biệt
+    ở kỳ ngay sau mỗi lần nó từng về trong lịch sử. Trả về {"00".."99": số lần}.
+    """
+    specials = history.specials()
+    specials = specials[specials >= 0]
+    if len(specials) < 2:
+        return {}
+    latest = specials[-1]
+    following = specials[1:][specials[:-1] == latest]
+    counts = np.bincount(following, minlength=TAILS)
+    return {f"{tail:02d}": int(counts[tail]) for tail in np.flatnonzero(counts)}
+
+
+def _run_lengths(present):
+    """
+    Với mỗi kỳ i và cặp số t: số kỳ liên tiếp tính tới i mà present[:, t] giữ nguyên True.
+    Dùng vị trí gần nhất mà present là False thay cho vòng lặp theo kỳ.
+    """
+    idx = np.arange(len(present), dtype=np.int32)[:, None]
+    last_false = np.maximum.accumulate(np.where(present, -1, idx), axis=0)
+    return idx - last_false
+
+
+def lo_gan(history, limit=10):
+    """Các cặp số lâu chưa về nhất: số kỳ chưa về hiện tại, gan cực đại trong khoảng, ngày về gần nhất."""
+    if not len(history):
+        return []
+    present = history.presence()
+    absent_runs = _run_lengths(~present)
+    current = absent_runs[-1]
+    longest = absent_runs.max(axis=0)
+    seen = present.any(axis=0)
+    last_seen = len(present) - 1 - np.argmax(present[::-1], axis=0)
+    order = np.lexsort((np.arange(TAILS), -current))[:limit]
+    return [{
+        "so": f"{tail:02d}",
+        "gan": int(current[tail]),
+        "gan_max": int(longest[tail]),
+        "last_date": history.dates[last_seen[tail]].strftime("%d/%m/%Y") if seen[tail] else None
+    } for tail in order]
+
+
+def streaks(history, limit=10):
+    """Các cặp số về liên tiếp nhiều kỳ nhất: chuỗi hiện tại và chuỗi dài nhất trong khoảng."""
+    if not len(history):
+        return []
+    runs = _run_lengths(history.presence())
+    current = runs[-1]
+    longest = runs.max(axis=0)
+    order = np.lexsort((np.arange(TAILS), -current, -longest))[:limit]
+    return [{
+        "so": f"{tail:02d}",
+        "current": int(current[tail]),
+        "longest": int(longest[tail])
+    } for tail in order if longest[tail]]
+
+
+def pair_cooccurrence(history, limit=10, number=None):
+    """
+    Số kỳ mà hai cặp số cùng về. Ma trận 100x100 được tính bằng một phép nhân present.T @ present;
+    có number thì chỉ trả về các cặp hay về cùng number.
+    """
+    if not len(history):
+        return []
+    # Nhân ma trận float32 đi qua BLAS, nhanh hơn nhiều so với int; số kỳ < 2^24 nên vẫn đếm chính xác
+    present = history.presence().astype(np.float32)
+    together = (present.T @ present).astype(np.int64)
+    if number is not None:
+        counts = together[number].copy()
+        counts[number] = 0
+        order = np.lexsort((np.arange(TAILS), -counts))[:limit]
+        return [{"pair": [f"{number:02d}", f"{tail:02d}"], "count": int(counts[tail])}
+                for tail in order if counts[tail]]
+    rows, cols = PAIR_ROWS, PAIR_COLS
+    counts = together[rows, cols]
+    order = np.lexsort((np.arange(len(counts)), -counts))[:limit]
+    return [{"pair": [f"{rows[i]:02d}", f"{cols[i]:02d}"], "count": int(counts[i])}
+            for i in order if counts[i]]
+
+
+def head_tail_frequency(history):
+    """Tần suất chữ số đầu (hàng chục) và đuôi (hàng đơn vị) của lô tô trong khoảng."""
+    totals = np.bincount(history.tail, minlength=TAILS).reshape(10, 10)
+    return {
+        "dau": {str(digit): int(count) for digit, count in enumerate(totals.sum(axis=1))},
+        "duoi": {str(digit): int(count) for digit, count in enumerate(totals.sum(axis=0))}
+    }
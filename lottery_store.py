@@ -0,0 +1,110 @@
+# lottery_store.py
+# Kho lưu vĩnh viễn kết quả xổ số đã parse, theo (loại xổ số/tỉnh, ngày quay).
+# Kết quả đã công bố không bao giờ đổi nên ngày đã qua chỉ cần lấy từ kqxs.vn một lần.
+
+import datetime
+import json
+import os
+import sqlite3
+import threading
+
+
+class LotteryStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS draws ("
+            "lottery_type TEXT NOT NULL, draw_date TEXT NOT NULL, result TEXT NOT NULL, "
+            "table_html TEXT, title TEXT, source TEXT, fetched_at TEXT NOT NULL, "
+            "PRIMARY KEY (lottery_type, draw_date))"
+        )
+        self._conn.commit()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def _row_to_draw(row):
+        lottery_type, draw_date, result, table_html, title, source = row
+        return {
+            "lottery_type": lottery_type,
+            "draw_date": datetime.date.fromisoformat(draw_date),
+            "result": json.loads(result),
+            "table_result": table_html,
+            "title": title,
+            "source": source
+        }
+
+    def get(self, lottery_type, draw_date):
+        """Kết quả của một kỳ quay, None nếu chưa có trong kho."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lottery_type, draw_date, result, table_html, title, source FROM draws "
+                "WHERE lottery_type = ? AND draw_date = ?",
+                (lottery_type, draw_date.isoformat())
+            ).fetchone()
+            self._stats["hits" if row else "misses"] += 1
+        return self._row_to_draw(row) if row else None
+
+    def put(self, lottery_type, draw_date, result, table_html=None, title=None, source=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO draws "
+                "(lottery_type, draw_date, result, table_html, title, source, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (lottery_type, draw_date.isoformat(), json.dumps(result, ensure_ascii=False),
+                 table_html, title, source, datetime.datetime.now().isoformat(timespec="seconds"))
+            )
+            self._conn.commit()
+            self._stats["stores"] += 1
+
+    def history(self, lottery_type, start=None, end=None):
+        """Các kỳ quay (cũ -> mới) của một loại xổ số trong khoảng [start, end]."""
+        query = ("SELECT lottery_type, draw_date, result, table_html, title, source FROM draws "
+                 "WHERE lottery_type = ?")
+        params = [lottery_type]
+        if start is not None:
+            query += " AND draw_date >= ?"
+            params.append(start.isoformat())
+        if end is not None:
+            query += " AND draw_date <= ?"
+            params.append(end.isoformat())
+        query += " ORDER BY draw_date"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._row_to_draw(row) for row in rows]
+
+    def dates(self, lottery_type):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT draw_date FROM draws WHERE lottery_type = ?", (lottery_type,)
+            ).fetchall()
+        return {datetime.date.fromisoformat(row[0]) for row in rows}
+
+    def version(self, lottery_type):
+        """
+        Thay đổi mỗi khi loại xổ số có kỳ được lưu (kể cả từ process khác): INSERT OR REPLACE luôn
+        cấp rowid mới, và COUNT/MAX(rowid) chỉ cần đọc index của khoá chính.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*), MAX(rowid) FROM draws WHERE lottery_type = ?", (lottery_type,)
+            ).fetchone()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT lottery_type, COUNT(*) FROM draws GROUP BY lottery_type"
+            ).fetchall())
+            return {**self._stats, "draws": sum(counts.values()), "lottery_types": counts, "path": self.path}
+
+
+def _default_path():
+    path = os.getenv("LOTTERY_STORE_PATH", "lottery_results.sqlite3")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return path
+
+
+lottery_store = LotteryStore(_default_path())
@@ -0,0 +1,200 @@
+import datetime
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import lottery_schedule
+from lottery_service import LotteryService
+from lottery_stats import PROVINCE_TYPES
+
+class LotteryTicketService:
+    service_name = 'lottery_ticket_service'
+    # Số kỳ quay tải song song khi các vé thuộc nhiều kỳ khác nhau
+    fetch_concurrency = int(os.getenv("LOTTERY_TICKET_FETCH_CONCURRENCY", 4))
+    max_tickets = int(os.getenv("LOTTERY_TICKET_MAX", 1000))
+    PRIZE_KEYS = list(LotteryService.PRIZE_NAMES)
+
+    NO_RESULT = "Không có kết quả cho kỳ quay này."
+
+    def get_cache_ttl(self, json_data, response):
+        # Vé của kỳ hôm nay có thể được dò khi đang quay dở, chỉ cache lâu khi mọi kỳ đã có đủ kết quả
+        if response.get("status") != 200:
+            return 0
+        # Kỳ chưa có kết quả (vd: dò vé hôm nay trước giờ quay) có thể có kết quả ngay sau đó
+        if any(ticket.get("error") == self.NO_RESULT for ticket in response["result"]["tickets"]):
+            return 0
+        if not all(draw["complete"] for draw in response["result"]["draws"]):
+            return 60
+        # Vé không ghi ngày được dò với kỳ mới nhất, chỉ đúng tới khi kỳ kế tiếp bắt đầu quay
+        ttl = 3600
+        tickets, _ = self.parse_tickets(json_data)
+        now = lottery_schedule.now()
+        for lottery_type in {ticket["lottery_type"] for ticket in tickets or [] if ticket["date"] is None}:
+            next_draw = lottery_schedule.next_draw(lottery_type, now)
+            if next_draw is not None:
+                ttl = min(ttl, max(0, int((next_draw - now).total_seconds())))
+        return ttl
+
+    @staticmethod
+    def format_date(value):
+        return value.strftime("%d/%m/%Y") if value else None
+
+    def parse_tickets(self, json_data):
+        """Chuẩn hoá danh sách vé, trả về (tickets, lỗi). Mỗi vé: {"number", "lottery_type", "date"}."""
+        tickets = json_data.get("tickets")
+        if not isinstance(tickets, list) or not tickets:
+            return None, "Bạn chưa cung cấp danh sách vé (tickets)."
+        if len(tickets) > self.max_tickets:
+            return None, f"Tối đa {self.max_tickets} vé mỗi lần dò."
+        # Loại xổ số/ngày chung cho các vé không tự khai báo
+        default_type = json_data.get("lottery_type") or "Miền Bắc"
+        default_date = json_data.get("duration.startDate", "")
+        parsed = []
+        for ticket in tickets:
+            if not isinstance(ticket, dict):
+                ticket = {"number": ticket}
+            number = str(ticket.get("number", "")).strip()
+            lottery_type = ticket.get("lottery_type") or default_type
+            date_text = ticket.get("date") or default_date
+            if lottery_type not in PROVINCE_TYPES:
+                return None, f"Không hỗ trợ dò vé cho: {lottery_type}."
+            if not number.isdigit() or len(number) > 6:
+                return None, f"Số vé không hợp lệ: {number}."
+            try:
+                draw_date = datetime.datetime.strptime(date_text, "%d/%m/%Y").date() if date_text else None
+            except (TypeError, ValueError):
+                # TypeError: ngày không phải chuỗi (số, list...)
+                return None, f"Ngày không hợp lệ: {date_text} (dd/mm/yyyy)."
+            parsed.append({"number": number, "lottery_type": lottery_type, "date": draw_date})
+        return parsed, None
+
+    def load_draw(self, lottery_type, draw_date, log):
+        """Kết quả của kỳ (loại, ngày), None nếu ngày đó không có kỳ quay hoặc chưa có kết quả."""
+        now = lottery_schedule.now()
+        # Kỳ chưa quay thì chưa có kết quả, không cần hỏi kqxs.vn
+        if draw_date is not None and draw_date >= now.date() and \
+                lottery_schedule.phase(lottery_type, draw_date, now) in ("before", "no_draw"):
+            return None
+        # Kỳ đang quay đọc qua live_poller như LotteryService, không tự gọi kqxs.vn
+        draw, search_url, _ = LotteryService.current_draw(lottery_type, draw_date, log, now)
+        if draw is None or not draw["result"]:
+            return None
+        shown_date = draw.get("draw_date") or LotteryService.parse_draw_date(draw)
+        # Ngày không có kỳ quay: trang kết quả hiển thị kỳ khác, không được dò nhầm
+        if draw_date is not None and shown_date is not None and shown_date != draw_date:
+            return None
+        return {
+            "result": draw["result"],
+            "date": shown_date or draw_date,
+            "source": search_url,
+            "complete": LotteryService.is_complete(draw["result"])
+        }
+
+    def match_tickets(self, result, numbers):
+        """
+        Dò mọi vé của một kỳ trong một lượt: vé trúng một giải khi các chữ số cuối của vé trùng với
+        số của giải đó (số có k chữ số so với k chữ số cuối của vé).
+        Trả về ma trận bool (số vé, số lượng số trúng thưởng) và chỉ số giải của từng cột.
+        """
+        values, mods, prizes = [], [], []
+        for prize, key in enumerate(self.PRIZE_KEYS):
+            winning = result.get(key)
+            for value in (winning if isinstance(winning, list) else [winning]):
+                if value and value.isdigit():
+                    values.append(int(value))
+                    mods.append(10 ** len(value))
+                    prizes.append(prize)
+        tickets = np.array([int(number) for number in numbers], dtype=np.int64)
+        matched = (tickets[:, None] % np.array(mods, dtype=np.int64)) == np.array(values, dtype=np.int64)
+        return matched, np.array(prizes, dtype=np.int64)
+
+    def check_draw(self, draw, tickets):
+        # Vé phải có đủ số chữ số như giải đặc biệt (5 với Miền Bắc, 6 với các tỉnh miền Nam/Trung)
+        special = draw["result"].get("giai_dac_biet")
+        special = special[0] if isinstance(special, list) else special
+        digits = len(special) if special else None
+        matched, prizes = self.match_tickets(draw["result"], [ticket["number"] for ticket in tickets])
+        results = []
+        for ticket, row in zip(tickets, matched):
+            item = {"number": ticket["number"], "lottery_type": ticket["lottery_type"],
+                    "date": self.format_date(draw["date"])}
+            if digits and len(ticket["number"]) != digits:
+                item.update({"won": False, "error": f"Vé {ticket['lottery_type']} phải có {digits} chữ số."})
+            else:
+                won = [self.PRIZE_KEYS[prize] for prize in prizes[row]]
+                item.update({
+                    "won": bool(won),
+                    "prize": LotteryService.PRIZE_NAMES[won[0]] if won else None,
+                    "prizes": [LotteryService.PRIZE_NAMES[key] for key in won]
+                })
+            results.append(item)
+        return results
+
+    def format_context(self, tickets):
+        lines = []
+        for ticket in tickets:
+            label = f"Vé {ticket['number']} ({ticket['lottery_type']}, {ticket.get('date') or 'không rõ ngày'})"
+            if ticket.get("error"):
+                lines.append(f"{label}: {ticket['error']}")
+            elif ticket["won"]:
+                lines.append(f"{label}: trúng {', '.join(ticket['prizes'])}.")
+            else:
+                lines.append(f"{label}: không trúng.")
+        return "\n".join(lines)
+
+    def process(self, json_data, log):
+        """
+        Dò nhiều vé một lúc: gom vé theo kỳ quay (loại xổ số, ngày), mỗi kỳ chỉ lấy kết quả một lần
+        rồi dò toàn bộ vé của kỳ đó trong một lượt.
+        """
+        response = {"message": "Success", "status": 200}
+        try:
+            tickets, error = self.parse_tickets(json_data)
+            if error:
+                response.update({"message": error, "status": 400})
+                return response
+
+            groups = {}
+            for index, ticket in enumerate(tickets):
+                groups.setdefault((ticket["lottery_type"], ticket["date"]), []).append(index)
+            log.debug(f"Checking {len(tickets)} tickets over {len(groups)} draws")
+
+            with ThreadPoolExecutor(max_workers=min(self.fetch_concurrency, len(groups))) as executor:
+                futures = {key: executor.submit(self.load_draw, key[0], key[1], log) for key in groups}
+                draws = {key: future.result() for key, future in futures.items()}
+
+            results = [None] * len(tickets)
+            draw_summaries = []
+            for key, indexes in groups.items():
+                draw = draws[key]
+                group = [tickets[index] for index in indexes]
+                if draw is None:
+                    checked = [{
+                        "number": ticket["number"],
+                        "lottery_type": ticket["lottery_type"],
+                        "date": self.format_date(ticket["date"]),
+                        "won": False,
+                        "error": self.NO_RESULT
+                    } for ticket in group]
+                else:
+                    checked = self.check_draw(draw, group)
+                    draw_summaries.append({
+                        "lottery_type": key[0],
+                        "date": self.format_date(draw["date"]),
+                        "complete": draw["complete"],
+                        "source": draw["source"]
+                    })
+                for index, item in zip(indexes, checked):
+                    results[index] = item
+
+            response["result"] = {"tickets": results, "draws": draw_summaries}
+            response["formatted_context"] = self.format_context(results)
+
+        except Exception as e:
+            traceback.print_exc()
+            response["message"] = str(e)
+            response["status"] = 500
+
+        return response
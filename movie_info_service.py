@@ -1,12 +1,13 @@
 import traceback
-import requests
+import http_client
 from datetime import datetime
-from bs4 import BeautifulSoup
+from html_parser import make_soup
 
 from common_service import CommonService
 
 class MovieInfoService(CommonService):
     service_name = "movie_info_service"
+    cache_ttl = 86400
 
     def __init__(self):
         super(MovieInfoService, self).__init__()
@@ -43,7 +44,7 @@ class MovieInfoService(CommonService):
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
             }
             
-            res = requests.get(base_url, params=params, headers=headers)
+            res = http_client.get(base_url, params=params, headers=headers)
             if res.status_code != 200:
                 response.update({
                     "message": f"Failed to fetch movie information, status_code: {res.status_code}",
@@ -52,7 +53,7 @@ class MovieInfoService(CommonService):
                 })
                 return response
 
-            soup = BeautifulSoup(res.text, "html.parser")
+            soup = make_soup(res.text)
             movie_results = soup.select("div.findResult")
 
             movies = []
@@ -1,12 +1,13 @@
 # movie_service.py
 
 import traceback
-import requests
+import http_client
 import json
 from common_service import CommonService  # hoặc from .common_service import CommonService nếu bạn đang để trong package
 
 class MovieService(CommonService):
     service_name = "movie_service"
+    cache_ttl = 3600
 
     def __init__(self):
         super().__init__()
@@ -58,7 +59,7 @@ class MovieService(CommonService):
             "Content-Type": "application/json"
         }
 
-        res = requests.get(url, headers=headers)
+        res = http_client.get(url, headers=headers)
         res_json = res.json()
 
         if res_json.get("errorCode") == 200:
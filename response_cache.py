@@ -0,0 +1,240 @@
+# response_cache.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from common_service import run_service_async
+from single_flight import SingleFlight, AsyncSingleFlight
+
+
+def normalize_payload(value):
+    """Chuẩn hoá payload để 2 request giống nhau về nội dung cho ra cùng một key."""
+    if isinstance(value, dict):
+        return {
+            k: normalize_payload(v)
+            for k, v in sorted(value.items())
+            if v is not None and v != ""
+        }
+    if isinstance(value, list):
+        return [normalize_payload(v) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+class LRUCache:
+    """Cache trong bộ nhớ, giới hạn số entry, bỏ entry ít dùng nhất khi đầy."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, prefix=""):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskCache:
+    """Tầng cache thứ 2 lưu trên SQLite, giữ được qua các lần restart."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, None
+            value, expires_at = row
+            if expires_at < time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None, None
+            return json.loads(value), expires_at
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at)
+            )
+            self._conn.commit()
+
+    def invalidate(self, prefix=""):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    Cache response của service theo (endpoint, payload đã chuẩn hoá).
+    Mỗi service tự khai báo TTL qua thuộc tính `cache_ttl` (giây, 0 = không cache)
+    hoặc method `get_cache_ttl(json_data, response)` nếu TTL phụ thuộc vào request/kết quả.
+    """
+
+    def __init__(self, max_entries=1024, disk_path=None):
+        self.memory = LRUCache(max_entries)
+        self.disk = DiskCache(disk_path) if disk_path else None
+        # Các request trùng key đang chờ upstream sẽ dùng chung một lần gọi service
+        self.flight = SingleFlight()
+        self.async_flight = AsyncSingleFlight()
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+    @staticmethod
+    def make_key(endpoint, json_data):
+        payload = json.dumps(normalize_payload(json_data or {}), sort_keys=True, ensure_ascii=False)
+        return f"{endpoint}|{payload}"
+
+    @staticmethod
+    def is_cacheable(service):
+        return bool(getattr(service, "cache_ttl", 0)) or hasattr(service, "get_cache_ttl")
+
+    @staticmethod
+    def get_ttl(service, json_data, response):
+        get_cache_ttl = getattr(service, "get_cache_ttl", None)
+        if get_cache_ttl is not None:
+            return get_cache_ttl(json_data, response)
+        # Mặc định chỉ cache response thành công
+        if not isinstance(response, dict) or response.get("status", 200) != 200:
+            return 0
+        return getattr(service, "cache_ttl", 0)
+
+    def _count(self, endpoint, name):
+        with self._stats_lock:
+            counters = self._stats.setdefault(endpoint, {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0})
+            counters[name] += 1
+
+    def get(self, endpoint, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count(endpoint, "hits")
+            self._count(endpoint, "memory_hits")
+            return value
+        if self.disk is not None:
+            value, expires_at = self.disk.get(key)
+            if value is not None:
+                # Đưa lên tầng bộ nhớ cho các lần sau
+                self.memory.set(key, value, expires_at)
+                self._count(endpoint, "hits")
+                self._count(endpoint, "disk_hits")
+                return value
+        self._count(endpoint, "misses")
+        return None
+
+    def set(self, endpoint, key, response, ttl):
+        if not ttl or ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        self.memory.set(key, response, expires_at)
+        if self.disk is not None:
+            self.disk.set(key, response, expires_at)
+        self._count(endpoint, "stores")
+
+    def invalidate(self, endpoint=None):
+        prefix = f"{endpoint}|" if endpoint else ""
+        self.memory.invalidate(prefix)
+        if self.disk is not None:
+            self.disk.invalidate(prefix)
+
+    def process(self, endpoint, service, json_data, log):
+        """Chạy service.process qua cache."""
+        if not self.is_cacheable(service):
+            return service.process(json_data=json_data, log=log)
+        key = self.make_key(endpoint, json_data)
+        response = self.get(endpoint, key)
+        if response is not None:
+            log.debug("Cache hit %s", key)
+            return response
+
+        def fill():
+            result = service.process(json_data=json_data, log=log)
+            self.set(endpoint, key, result, self.get_ttl(service, json_data, result))
+            return result
+
+        return self.flight.do(key, fill)
+
+    async def aprocess(self, endpoint, service, json_data, log):
+        if not self.is_cacheable(service):
+            return await run_service_async(service, json_data, log)
+        key = self.make_key(endpoint, json_data)
+        response = self.get(endpoint, key)
+        if response is not None:
+            log.debug("Cache hit %s", key)
+            return response
+
+        async def fill():
+            result = await run_service_async(service, json_data, log)
+            self.set(endpoint, key, result, self.get_ttl(service, json_data, result))
+            return result
+
+        return await self.async_flight.do(key, fill)
+
+    def stats(self):
+        with self._stats_lock:
+            endpoints = {k: dict(v) for k, v in self._stats.items()}
+        totals = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        for counters in endpoints.values():
+            for name, value in counters.items():
+                totals[name] += value
+        return {
+            **totals,
+            "memory_entries": len(self.memory),
+            "disk_enabled": self.disk is not None,
+            "single_flight": self.flight.stats(),
+            "async_single_flight": self.async_flight.stats(),
+            "endpoints": endpoints
+        }
+
+
+def _default_disk_path():
+    cache_dir = os.getenv("RESPONSE_CACHE_DIR")
+    if not cache_dir:
+        return None
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, "response_cache.sqlite3")
+
+
+# Cache dùng chung cho cả process
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024)),
+    disk_path=_default_disk_path()
+)
@@ -5,6 +5,7 @@ from common_service import CommonService
 
 class SearchAllService(CommonService):
     service_name = "search_all"
+    cache_ttl = 3600
 
     def __init__(self):
         super(SearchAllService, self).__init__()
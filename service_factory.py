@@ -1,134 +1,174 @@
 # service_factory.py
 
-from movie_service import MovieService
-from weather_service import WeatherServicePhong 
-from weather_format_service import WeatherFormatService
-from football_schedule_service import FootballScheduleService
-from stock_quote_service import StockQuoteService
-from search_all_service import SearchAllService
-from stock_info_service import StockInfoService
-from gold_format_service import GoldPriceService
-from movie_info_service import MovieInfoService
-from wiki_search import WikiSearchService
-from data_process_service import DataProcessService
-from lottery_service import LotteryService
-from lottery_monthly_stats_service import LotteryMonthlyStatsService
-from dream_lottery_service import DreamLotteryService
-from calendar_service import CalendarService
+import importlib
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from movie_service import MovieService
+    from weather_service import WeatherServicePhong
+    from weather_format_service import WeatherFormatService
+    from gold_format_service import GoldPriceService
+    from movie_info_service import MovieInfoService
+    from wiki_search import WikiSearchService
+    from data_process_service import DataProcessService
+    from lottery_service import LotteryService
+    from lottery_monthly_stats_service import LotteryMonthlyStatsService
+    from lottery_analytics_service import LotteryAnalyticsService
+    from lottery_ticket_service import LotteryTicketService
+    from dream_lottery_service import DreamLotteryService
+    from calendar_service import CalendarService
+    from batch_service import BatchService
+
+# service_name -> (module, class). Module chỉ được import khi service được dùng lần đầu,
+# tránh việc import selenium/bs4/... của mọi service ngay lúc khởi động app
+SERVICE_CLASSES = {
+    "movie_service": ("movie_service", "MovieService"),
+    "weather_service_phong": ("weather_service", "WeatherServicePhong"),
+    "weather_format_service": ("weather_format_service", "WeatherFormatService"),
+    "football_schedule_service": ("football_schedule_service", "FootballScheduleService"),
+    "search_all": ("search_all_service", "SearchAllService"),
+    "stock_quote_service": ("stock_quote_service", "StockQuoteService"),
+    "stock_info_service": ("stock_info_service", "StockInfoService"),
+    "gold_price_service": ("gold_format_service", "GoldPriceService"),
+    "movie_info_service": ("movie_info_service", "MovieInfoService"),
+    "wiki_search_service": ("wiki_search", "WikiSearchService"),
+    "data_process": ("data_process_service", "DataProcessService"),
+    "lottery_service": ("lottery_service", "LotteryService"),
+    "lottery_monthly_stats_service": ("lottery_monthly_stats_service", "LotteryMonthlyStatsService"),
+    "lottery_analytics_service": ("lottery_analytics_service", "LotteryAnalyticsService"),
+    "lottery_ticket_service": ("lottery_ticket_service", "LotteryTicketService"),
+    "dream_lottery_service": ("dream_lottery_service", "DreamLotteryService"),
+    "calendar_service": ("calendar_service", "CalendarService"),
+    "batch_service": ("batch_service", "BatchService"),
+}
+
+# Endpoint HTTP -> service_name, dùng chung cho entry point ASGI
+ENDPOINT_SERVICES = {
+    "/search/movie": "movie_service",
+    "/search/weatherPhong": "weather_service_phong",
+    "/search/weather/format": "weather_format_service",
+    "/search/footballSchedule": "football_schedule_service",
+    "/search/searchAll": "search_all",
+    "/search/stockQuote": "stock_quote_service",
+    "/search/stockInfo": "stock_info_service",
+    "/search/gold/format": "gold_price_service",
+    "/search/movieInfo": "movie_info_service",
+    "/search/wiki": "wiki_search_service",
+    "/search/process-data": "data_process",
+    "/search/lottery": "lottery_service",
+    "/search/lottery-monthly-stats": "lottery_monthly_stats_service",
+    "/search/lottery-analytics": "lottery_analytics_service",
+    "/search/lottery-tickets": "lottery_ticket_service",
+    "/search/dream-lottery": "dream_lottery_service",
+    "/api/gold": "gold_price_service",
+    "/search/calendar": "calendar_service",
+    "/search/batch": "batch_service",
+}
+
 
 class ServiceFactory:
-    def __init__(self):
-        # Lưu cache các instance của service
-        self.dic = {}
-
-    def get_movie_service(self) -> MovieService:
-        key = MovieService.service_name
-        if key in self.dic:
-            return self.dic[key]
-        # Khởi tạo mới và cache lại
-        self.dic[key] = MovieService()
-        return self.dic[key]
-    
-    def get_weather_service_phong(self) -> WeatherServicePhong:
-        key = WeatherServicePhong.service_name
-        if key in self.dic:
-            return self.dic[key]
-        # Phải khởi WeatherServicePhong, không phải WeatherService
-        self.dic[key] = WeatherServicePhong()
-        return self.dic[key]
-    
-    def get_weather_format_service(self) -> WeatherFormatService:
-        key = WeatherFormatService.service_name
-        if key in self.dic:
-            return self.dic[key]
-        self.dic[key] = WeatherFormatService()
-        return self.dic[key]
-    
+    # Cache các instance của service, dùng chung cho toàn bộ process (mọi request, mọi thread)
+    dic = {}
+    _lock = threading.Lock()
+
+    def get(self, service_name):
+        service = self.dic.get(service_name)
+        if service is not None:
+            return service
+
+        with self._lock:
+            # Kiểm tra lại sau khi lấy lock, có thể thread khác vừa khởi tạo xong
+            service = self.dic.get(service_name)
+            if service is None:
+                if service_name not in SERVICE_CLASSES:
+                    raise ValueError(f"Unknown service: {service_name}")
+                module_name, class_name = SERVICE_CLASSES[service_name]
+                service_class = getattr(importlib.import_module(module_name), class_name)
+                service = service_class()
+                self.dic[service_name] = service
+        return service
+
+    def get_for_endpoint(self, endpoint):
+        if endpoint not in ENDPOINT_SERVICES:
+            raise ValueError(f"Unknown endpoint: {endpoint}")
+        return self.get(ENDPOINT_SERVICES[endpoint])
+
+    def warm_up(self, service_names, log):
+        """
+        Khởi tạo trước các service được chọn (import module, tạo session, pre-connect TLS...)
+        để request đầu tiên không phải trả chi phí cold start.
+        """
+        for service_name in service_names:
+            service_name = service_name.strip()
+            if not service_name:
+                continue
+            try:
+                service = self.get(service_name)
+                warm_up = getattr(service, "warm_up", None)
+                if warm_up is not None:
+                    warm_up(log)
+                log.info("Warmed up service %s", service_name)
+            except Exception as e:
+                log.warning("Warm up service %s failed: %s", service_name, e)
+
+    def get_movie_service(self) -> "MovieService":
+        return self.get("movie_service")
+
+    def get_weather_service_phong(self) -> "WeatherServicePhong":
+        return self.get("weather_service_phong")
+
+    def get_weather_format_service(self) -> "WeatherFormatService":
+        return self.get("weather_format_service")
+
     def get_football_schedule_service(self):
-        key = FootballScheduleService.service_name
-        if key in self.dic:
-            return self.dic[key]
-        self.dic[key] = FootballScheduleService()
-        return self.dic[key]
-    
+        return self.get("football_schedule_service")
+
     def get_search_all_service(self):
-        key = SearchAllService.service_name
-        if key in self.dic:
-            return self.dic[key]
-        self.dic[key] = SearchAllService()
-        return self.dic[key]
-    
+        return self.get("search_all")
+
+    def get_stock_quote_service(self):
+        return self.get("stock_quote_service")
+
     def get_stock_info_service(self):
-        key = StockInfoService.service_name
-        if key in self.dic:
-            return self.dic[key]
-        self.dic[key] = StockInfoService()
-        return self.dic[key]
-    
-    def get_gold_format_service(self) -> GoldPriceService:
-        key = GoldPriceService.service_name
-        if key in self.dic:
-            return self.dic[key]
-        self.dic[key] = GoldPriceService()
-        return self.dic[key]
-    
-    def get_movie_info_service(self) -> MovieInfoService:
-        key = MovieInfoService.service_name
-        if key in self.dic:
-            return self.dic[key]
-        self.dic[key] = MovieInfoService()
-        return self.dic[key]
-    
-    def get_wiki_search_service(self) -> WikiSearchService:
-        key = WikiSearchService.service_name
-        if key in self.dic:
-            return self.dic[key]
-        self.dic[key] = WikiSearchService()
-        return self.dic[key]
-    
-    def get_data_process_service(self) -> DataProcessService:
-        key = DataProcessService.service_name
-        if key in self.dic:
-            return self.dic[key]
-        self.dic[key] = DataProcessService()
-        return self.dic[key]
-    
-    def get_lottery_service(self) -> LotteryService:
-        key = LotteryService.service_name
-        if key in self.dic:
-            return self.dic[key]
-        self.dic[key] = LotteryService()
-        return self.dic[key]
-    
-    def get_lottery_monthly_stats_service(self) -> LotteryMonthlyStatsService:
-        key = LotteryMonthlyStatsService.service_name
-        if key in self.dic:
-            return self.dic[key]
-        self.dic[key] = LotteryMonthlyStatsService()
-        return self.dic[key]
-    
-    def get_dream_lottery_service(self) -> DreamLotteryService:
-        key = DreamLotteryService.service_name
-        if key in self.dic:
-            return self.dic[key]
-        self.dic[key] = DreamLotteryService()
-        return self.dic[key]
-    
-    def get_calendar_service(self) -> CalendarService:
-        key = CalendarService.service_name
-        if key in self.dic:
-            return self.dic[key]
-        self.dic[key] = CalendarService()
-        return self.dic[key]
-    
+        return self.get("stock_info_service")
+
+    def get_gold_format_service(self) -> "GoldPriceService":
+        return self.get("gold_price_service")
+
+    def get_movie_info_service(self) -> "MovieInfoService":
+        return self.get("movie_info_service")
+
+    def get_wiki_search_service(self) -> "WikiSearchService":
+        return self.get("wiki_search_service")
+
+    def get_data_process_service(self) -> "DataProcessService":
+        return self.get("data_process")
+
+    def get_lottery_service(self) -> "LotteryService":
+        return self.get("lottery_service")
+
+    def get_lottery_monthly_stats_service(self) -> "LotteryMonthlyStatsService":
+        return self.get("lottery_monthly_stats_service")
+
+    def get_lottery_analytics_service(self) -> "LotteryAnalyticsService":
+        return self.get("lottery_analytics_service")
+
+    def get_lottery_ticket_service(self) -> "LotteryTicketService":
+        return self.get("lottery_ticket_service")
+
+    def get_dream_lottery_service(self) -> "DreamLotteryService":
+        return self.get("dream_lottery_service")
+
+    def get_calendar_service(self) -> "CalendarService":
+        return self.get("calendar_service")
+
+    def get_batch_service(self) -> "BatchService":
+        return self.get("batch_service")
+
     @staticmethod
     def get_service(service_name):
-        if service_name == "gold_price_service":
-            return GoldPriceService()
-        elif service_name == "calendar_service":
-            return CalendarService()
+        if service_name in ("gold_price_service", "calendar_service"):
+            return ServiceFactory().get(service_name)
         else:
             raise ValueError(f"Unknown service: {service_name}")
-    
-    
-
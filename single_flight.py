@@ -0,0 +1,83 @@
+# single_flight.py
+
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Gộp các lời gọi trùng key đang chạy đồng thời: chỉ thread đầu tiên thực sự gọi fn,
+    các thread đến sau chờ và dùng chung kết quả (hoặc exception) của lần gọi đó.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"calls": 0, "shared": 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["calls"] += 1
+            else:
+                self._stats["shared"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """Phiên bản asyncio của SingleFlight, dùng cho entry point ASGI."""
+
+    def __init__(self):
+        self._calls = {}
+        self._stats = {"calls": 0, "shared": 0}
+
+    async def do(self, key, coro_fn):
+        future = self._calls.get(key)
+        if future is not None:
+            self._stats["shared"] += 1
+            # shield để 1 caller bị huỷ không huỷ luôn lần gọi dùng chung
+            return await asyncio.shield(future)
+
+        self._stats["calls"] += 1
+        future = asyncio.ensure_future(coro_fn())
+        self._calls[key] = future
+        future.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(future)
+
+    def stats(self):
+        return {**self._stats, "in_flight": len(self._calls)}
+
+
+# Dùng chung cho các lần fetch upstream theo URL
+upstream = SingleFlight()
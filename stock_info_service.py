@@ -1,18 +1,226 @@
+import os
+import time
 import traceback
-import requests
+import http_client
 import re
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
 from datetime import datetime
-from bs4 import BeautifulSoup
+from html_parser import make_soup
 
 from common_service import CommonService
 
 
+class StockNotFoundError(Exception):
+    """Serp không tìm thấy trang của mã cổ phiếu (trả về 404)."""
+
+
 class StockInfoService(CommonService):
     service_name = "stock_info_service"
+    cache_ttl = 60  # giá cổ phiếu thay đổi liên tục trong phiên
+    warm_up_urls = ["https://finance.vietstock.vn"]
+    # Deadline (giây) cho cả request, phần nào chưa xong thì trả về phần đã có
+    DEADLINE = float(os.getenv("STOCK_INFO_DEADLINE", 10))
+
+    # Pool dùng chung cho mọi request, phần bị bỏ do quá hạn không giữ request phải đợi
+    _executor = ThreadPoolExecutor(
+        max_workers=int(os.getenv("STOCK_INFO_MAX_WORKERS", 16)),
+        thread_name_prefix="stock-info"
+    )
 
     def __init__(self):
         super().__init__()
 
+    def get_cache_ttl(self, json_data, response):
+        # Response thiếu phần nào (lỗi/quá hạn) thì không cache để request sau lấy lại đủ
+        if response.get("status") != 200 or response.get("partial"):
+            return 0
+        return self.cache_ttl
+
+    def _timeout(self, deadline):
+        """(connect, read) timeout cho một lần gọi, không vượt quá thời gian còn lại của request."""
+        remaining = max(deadline - time.monotonic(), 0.5)
+        return (min(http_client.DEFAULT_TIMEOUT[0], remaining), min(http_client.DEFAULT_TIMEOUT[1], remaining))
+
+    def _search_url(self, query):
+        raw_results = self.serp.search(message=query, num_results=1)
+        if not raw_results:
+            raise StockNotFoundError(f"Không tìm thấy kết quả cho '{query}'.")
+        first = raw_results[0]
+        url = first.get("link") if isinstance(first, dict) else first
+        if not url:
+            raise StockNotFoundError("Không tìm thấy link trong kết quả.")
+        return url
+
+    def _fetch_quote(self, query, symbol, deadline):
+        """Serp -> trang kết quả: URL, giá, thay đổi, trạng thái, summary..."""
+        url = self._search_url(query)
+        r = http_client.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=self._timeout(deadline))
+        r.raise_for_status()
+        soup = make_soup(r.text)
+        quote = {"url": url}
+
+        # Lấy vùng chứa giá
+        row = soup.select_one("div.row.stock-price-info")
+        if not row:
+            raise ValueError("Không tìm thấy khu vực stock-price-info trên trang.")
+
+        # — last_price —
+        el_price = row.select_one("h2#stockprice span.price")
+        last_price = None
+        if el_price:
+            try:
+                last_price = float(el_price.text.replace(",", ""))
+            except:
+                pass
+        quote["last_price"] = last_price
+
+        # — change & per_change —
+        change = per_change = None
+        el_change = row.select_one("div#stockchange")
+        if el_change:
+            txt = el_change.get_text(" ", strip=True)
+            m = re.search(r"([+\-]?[0-9,\.]+)\s*\(\s*([+\-]?[0-9\.]+)%\s*\)", txt)
+            if m:
+                change = float(m.group(1).replace(",", ""))
+                per_change = float(m.group(2))
+            else:
+                try:
+                    change = float(txt.replace(",", "").split()[0])
+                except:
+                    pass
+        quote["change"] = change
+        quote["per_change"] = per_change
+
+        # — trading_date —
+        trading_date = None
+        el_date = row.select_one("div#tradedate")
+        if el_date:
+            dt_txt = el_date.get_text(strip=True)
+            datetime.strptime(dt_txt, "%d/%m/%Y %H:%M")
+            trading_date = dt_txt
+        quote["trading_date"] = trading_date
+
+        # — trading_status_name —
+        trading_status = None
+        el_status = row.select_one("small#tradingstatus")
+        if el_status:
+            trading_status = el_status.get_text(strip=True)
+        quote["trading_status_name"] = trading_status
+
+        # — full_name & name —
+        full_el = soup.select_one("h2.title-2.text")
+        quote["full_name"] = full_el.get_text(strip=True) if full_el else None
+        quote["name"] = symbol
+
+        # Lấy summary
+        summary = {}
+        for p in row.select("p.p8"):
+            b = p.find("b")
+            if not b:
+                continue
+            value = b.get_text(strip=True)
+            key = p.get_text("|||", strip=True).split("|||")[0].strip(": ")
+            summary[key] = value
+        quote["summary"] = summary
+        return quote
+
+    def _fetch_token(self, symbol, deadline):
+        """Trang cổ phiếu trên vietstock: session (giữ cookie) và token cho 2 API biểu đồ."""
+        stock_url = f"https://finance.vietstock.vn/{symbol}-ctcp-{symbol.lower()}.htm"
+        # Session riêng để giữ cookie/token của request này, connection pool vẫn dùng chung
+        session = http_client.new_session()
+        r = http_client.get(stock_url, session=session, timeout=self._timeout(deadline))
+        r.raise_for_status()
+        soup = make_soup(r.text)
+        token_input = soup.find("input", {"name": "__RequestVerificationToken"})
+        token = token_input["value"] if token_input else session.cookies.get("__RequestVerificationToken", "")
+        cookies = session.cookies.get_dict()
+        post_headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "X-Requested-With": "XMLHttpRequest",
+            "Cookie": "; ".join(f"{k}={v}" for k, v in cookies.items())
+        }
+        return session, token, post_headers
+
+    def _fetch_chart(self, symbol, auth, deadline):
+        """Dữ liệu biểu đồ 12 tháng"""
+        session, token, post_headers = auth
+        chart_url = "https://finance.vietstock.vn/data/getstockdealdetailbytime"
+        chart_payload = {
+            "code": symbol,
+            "seq": 0,
+            "timetype": "1Y",
+            "tradingDate": "",
+            "__RequestVerificationToken": token
+        }
+        cj = http_client.post(chart_url, session=session, data=chart_payload, headers=post_headers,
+                              timeout=self._timeout(deadline))
+        cj.raise_for_status()
+        chart_js = cj.json()
+        data = chart_js if isinstance(chart_js, list) else chart_js.get("Data", [])
+        # Format & trim chart_data
+        for d in data:
+            if d.get("TradingDate", "").startswith("/Date("):
+                ts = int(d["TradingDate"].split("(")[1].split(")")[0]) // 1000
+                d["TradingDate"] = datetime.fromtimestamp(ts).strftime("%d/%m/%Y")
+            for k in ("Min", "Max", "Package", "Timetype", "TradingDateStr"):
+                d.pop(k, None)
+        return data
+
+    def _fetch_chart_day(self, symbol, auth, deadline):
+        """Dữ liệu biểu đồ trong ngày"""
+        session, token, post_headers = auth
+        daily_chart_url = "https://finance.vietstock.vn/data/getstockdealdetailchart"
+        daily_payload = {
+            "code": symbol,
+            "interval": 1,
+            "__RequestVerificationToken": token
+        }
+        dj = http_client.post(daily_chart_url, session=session, data=daily_payload, headers=post_headers,
+                              timeout=self._timeout(deadline))
+        dj.raise_for_status()
+        daily_js = dj.json()
+        daily_data = daily_js if isinstance(daily_js, list) else daily_js.get("Data", [])
+        # Format & trim chart_data_day
+        for d in daily_data:
+            raw = d.get("TradingDate", "")
+            if raw.startswith("/Date(") and raw.endswith(")/"):
+                ms = int(raw[6:-2])
+                dt = datetime.fromtimestamp(ms / 1000)
+                d["TradingDateStr"] = dt.strftime("%Y-%m-%d %H:%M:%S")
+            else:
+                d["TradingDateStr"] = None
+            # Xóa các trường không mong muốn
+            for k in ("isBuy", "IsBuy", "stockcode", "StockCode", "Stockcode", "TradingDate", "Package", "TotalVal", "TotalVol"):
+                d.pop(k, None)
+        return daily_data
+
+    def _format_context(self, response):
+        """formated_context (không bao gồm chart_data_day), chart_data sắp xếp theo ngày giảm dần"""
+        sorted_chart = []
+        for d in response["chart_data"]:
+            try:
+                dt = datetime.strptime(d["TradingDate"], "%d/%m/%Y")
+            except:
+                dt = datetime.min
+            sorted_chart.append((dt, d))
+        sorted_chart.sort(key=lambda x: x[0], reverse=True)
+
+        parts = [
+            f"Mã cổ phiếu: {response['stock_code']}",
+            f"Tên đầy đủ: {response['full_name']}",
+            f"Ngày giao dịch: {response['trading_date']}",
+            f"Giá hiện tại: {response['last_price']}",
+            f"Chênh lệch: {response['change']} ({response['per_change']}%)",
+            f"Trạng thái: {response['trading_status_name']}"
+        ]
+        for key, val in response["summary"].items():
+            parts.append(f"{key}: {val}")
+        # Thêm chart_data (1 năm) từ gần nhất
+        for _, d in sorted_chart:
+            parts.append(f"{d['TradingDate']}: Price {d.get('Price')} - Vol {d.get('Vol')}")
+        return "; ".join(parts)
+
     def process(self, json_data, log):
         response = {
             "message": "",
@@ -33,7 +241,7 @@ class StockInfoService(CommonService):
         }
 
         try:
-            # 1) Đọc query và symbol
+            # Đọc query và symbol
             query = (json_data.get("query") or json_data.get("message") or "").strip()
             if not query:
                 response.update({"message": "Bạn chưa cung cấp chuỗi tìm kiếm.", "status": 400})
@@ -41,188 +249,63 @@ class StockInfoService(CommonService):
 
             symbol = query.split()[-1].upper()
             response["stock_code"] = symbol
+            deadline = time.monotonic() + self.DEADLINE
 
-            # 2) Lấy URL chi tiết từ serp
-            raw_results = self.serp.search(message=query, num_results=1)
-            if not raw_results:
-                response.update({
-                    "message": f"Không tìm thấy kết quả cho '{query}'.",
-                    "status": 404
-                })
-                return response
+            # Hai nhánh độc lập chạy song song: serp -> trang kết quả (giá) và trang vietstock (token)
+            # -> 2 API biểu đồ. Thời gian chờ ~ nhánh dài nhất thay vì tổng 5 lần gọi
+            quote_future = self._executor.submit(self._fetch_quote, query, symbol, deadline)
+            token_future = self._executor.submit(self._fetch_token, symbol, deadline)
+            futures = {quote_future: "quote"}
+            errors = {}
+            try:
+                auth = token_future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                token_future.cancel()
+                errors["chart_data"] = errors["chart_data_day"] = "Quá thời gian lấy token vietstock."
+            except Exception as e:
+                log.warning(f"Vietstock token for {symbol} failed: {e}")
+                errors["chart_data"] = errors["chart_data_day"] = str(e)
+            else:
+                futures[self._executor.submit(self._fetch_chart, symbol, auth, deadline)] = "chart_data"
+                futures[self._executor.submit(self._fetch_chart_day, symbol, auth, deadline)] = "chart_data_day"
 
-            first = raw_results[0]
-            url = first["link"] if isinstance(first, dict) else first
-            if not url:
-                response.update({
-                    "message": "Không tìm thấy link trong kết quả.",
-                    "status": 404
-                })
-                return response
-            response["url"] = url
-
-            # 3) Fetch & parse HTML
-            r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
-            r.raise_for_status()
-            soup = BeautifulSoup(r.text, "html.parser")
-
-            # 4) Lấy vùng chứa giá
-            row = soup.select_one("div.row.stock-price-info")
-            if not row:
-                raise ValueError("Không tìm thấy khu vực stock-price-info trên trang.")
-
-            # — last_price —
-            el_price = row.select_one("h2#stockprice span.price")
-            last_price = None
-            if el_price:
+            done, not_done = wait(futures, timeout=max(deadline - time.monotonic(), 0))
+            for future, part in futures.items():
+                if future in not_done:
+                    # Phần chưa kịp xong thì bỏ, trả về dữ liệu đã có
+                    future.cancel()
+                    errors[part] = f"Quá thời gian xử lý ({self.DEADLINE}s)."
+                    continue
                 try:
-                    last_price = float(el_price.text.replace(",", ""))
-                except:
-                    pass
-            response["last_price"] = last_price
-
-            # — change & per_change —
-            change = per_change = None
-            el_change = row.select_one("div#stockchange")
-            if el_change:
-                txt = el_change.get_text(" ", strip=True)
-                m = re.search(r"([+\-]?[0-9,\.]+)\s*\(\s*([+\-]?[0-9\.]+)%\s*\)", txt)
-                if m:
-                    change = float(m.group(1).replace(",", ""))
-                    per_change = float(m.group(2))
-                else:
-                    try:
-                        change = float(txt.replace(",", "").split()[0])
-                    except:
-                        pass
-            response["change"] = change
-            response["per_change"] = per_change
-
-            # — trading_date —
-            trading_date = None
-            el_date = row.select_one("div#tradedate")
-            if el_date:
-                dt_txt = el_date.get_text(strip=True)
-                datetime.strptime(dt_txt, "%d/%m/%Y %H:%M")
-                trading_date = dt_txt
-            response["trading_date"] = trading_date
-
-            # — trading_status_name —
-            trading_status = None
-            el_status = row.select_one("small#tradingstatus")
-            if el_status:
-                trading_status = el_status.get_text(strip=True)
-            response["trading_status_name"] = trading_status
-
-            # — full_name & name —
-            full_el = soup.select_one("h2.title-2.text")
-            full_name = full_el.get_text(strip=True) if full_el else None
-            response["full_name"] = full_name
-            response["name"] = symbol
-
-            # 5) Lấy summary
-            summary = {}
-            for p in row.select("p.p8"):
-                b = p.find("b")
-                if not b:
+                    result = future.result()
+                except StockNotFoundError as e:
+                    # Serp không tìm thấy trang của mã: giữ nguyên 404 như trước
+                    response.update({"message": str(e), "status": 404})
+                    return response
+                except Exception as e:
+                    log.warning(f"Stock info {part} for {symbol} failed: {e}")
+                    errors[part] = str(e)
                     continue
-                value = b.get_text(strip=True)
-                key = p.get_text("|||", strip=True).split("|||")[0].strip(": ")
-                summary[key] = value
-            response["summary"] = summary
-
-            # Prepare session & token
-            stock_url = f"https://finance.vietstock.vn/{symbol}-ctcp-{symbol.lower()}.htm"
-            session = requests.Session()
-            session.headers.update({"User-Agent": "Mozilla/5.0"})
-            r = session.get(stock_url)
-            r.raise_for_status()
-            soup = BeautifulSoup(r.text, "html.parser")
-            token_input = soup.find("input", {"name": "__RequestVerificationToken"})
-            token = token_input["value"] if token_input else session.cookies.get("__RequestVerificationToken", "")
-            cookies = session.cookies.get_dict()
-            post_headers = {
-                "Content-Type": "application/x-www-form-urlencoded",
-                "X-Requested-With": "XMLHttpRequest",
-                "Cookie": "; ".join(f"{k}={v}" for k, v in cookies.items())
-            }
-
-            # 6) Lấy dữ liệu biểu đồ 12 tháng
-            chart_url = "https://finance.vietstock.vn/data/getstockdealdetailbytime"
-            chart_payload = {
-                "code": symbol,
-                "seq": 0,
-                "timetype": "1Y",
-                "tradingDate": "",
-                "__RequestVerificationToken": token
-            }
-            cj = session.post(chart_url, data=chart_payload, headers=post_headers)
-            cj.raise_for_status()
-            chart_js = cj.json()
-            data = chart_js if isinstance(chart_js, list) else chart_js.get("Data", [])
-            # Format & trim chart_data
-            for d in data:
-                if d.get("TradingDate", "").startswith("/Date("):
-                    ts = int(d["TradingDate"].split("(")[1].split(")")[0]) // 1000
-                    d["TradingDate"] = datetime.fromtimestamp(ts).strftime("%d/%m/%Y")
-                for k in ("Min", "Max", "Package", "Timetype", "TradingDateStr"):
-                    d.pop(k, None)
-            response["chart_data"] = data
-
-            # 6.1) Lấy dữ liệu biểu đồ ngày
-            daily_chart_url = "https://finance.vietstock.vn/data/getstockdealdetailchart"
-            daily_payload = {
-                "code": symbol,
-                "interval": 1,
-                "__RequestVerificationToken": token
-            }
-            dj = session.post(daily_chart_url, data=daily_payload, headers=post_headers)
-            dj.raise_for_status()
-            daily_js = dj.json()
-            daily_data = daily_js if isinstance(daily_js, list) else daily_js.get("Data", [])
-            # Format & trim chart_data_day
-            for d in daily_data:
-                raw = d.get("TradingDate", "")
-                if raw.startswith("/Date(") and raw.endswith(")/"):
-                    ms = int(raw[6:-2])
-                    dt = datetime.fromtimestamp(ms / 1000)
-                    d["TradingDateStr"] = dt.strftime("%Y-%m-%d %H:%M:%S")
+                if part == "quote":
+                    response.update(result)
                 else:
-                    d["TradingDateStr"] = None
-                # Xóa các trường không mong muốn
-                for k in ("isBuy", "IsBuy", "stockcode", "StockCode", "Stockcode", "TradingDate", "Package", "TotalVal", "TotalVol"):
-                    d.pop(k, None)
-            response["chart_data_day"] = daily_data
-
-            # 7) Tạo formated_context (không bao gồm chart_data_day)
-            #    Sắp xếp chart_data theo ngày giảm dần
-            sorted_chart = []
-            for d in response["chart_data"]:
-                try:
-                    dt = datetime.strptime(d["TradingDate"], "%d/%m/%Y")
-                except:
-                    dt = datetime.min
-                sorted_chart.append((dt, d))
-            sorted_chart.sort(key=lambda x: x[0], reverse=True)
-
-            parts = [
-                f"Mã cổ phiếu: {response['stock_code']}",
-                f"Tên đầy đủ: {response['full_name']}",
-                f"Ngày giao dịch: {response['trading_date']}",
-                f"Giá hiện tại: {response['last_price']}",
-                f"Chênh lệch: {response['change']} ({response['per_change']}%)",
-                f"Trạng thái: {response['trading_status_name']}"
-            ]
-            for key, val in response["summary"].items():
-                parts.append(f"{key}: {val}")
-            # Thêm chart_data (1 năm) từ gần nhất
-            for _, d in sorted_chart:
-                parts.append(f"{d['TradingDate']}: Price {d.get('Price')} - Vol {d.get('Vol')}")
-
-            response["formated_context"] = "; ".join(parts)
-            response["message"] = "Success!"
+                    response[part] = result
+
+            if len(errors) == 3:
+                # Không lấy được phần nào
+                response.update({"message": errors.get("quote") or next(iter(errors.values())), "status": 500})
+                return response
+
+            response["formated_context"] = self._format_context(response)
+            if errors:
+                # Thiếu một phần (lỗi hoặc quá hạn): vẫn trả về phần đã có
+                response["partial"] = True
+                response["errors"] = errors
+                response["message"] = "Success! Thiếu dữ liệu: " + ", ".join(errors)
+            else:
+                response["message"] = "Success!"
         except Exception as e:
             log.error(traceback.format_exc())
             response.update({"message": str(e), "status": 500})
 
-        return response
\ No newline at end of file
+        return response
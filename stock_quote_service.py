@@ -2,13 +2,15 @@
 
 import re
 import traceback
-import requests
-from bs4 import BeautifulSoup
+import http_client
+from html_parser import make_soup
 from common_service import CommonService
 
 class StockQuoteService(CommonService):
     service_name = "stock_quote_service"
+    cache_ttl = 60  # giá cổ phiếu thay đổi liên tục trong phiên
     ROOT_URL     = "https://finance.vietstock.vn"
+    warm_up_urls = [ROOT_URL]
 
     def __init__(self):
         super(StockQuoteService, self).__init__()
@@ -60,8 +62,8 @@ class StockQuoteService(CommonService):
         2) Fallback: scan toàn bộ <a href> để match pattern /<symbol>-...\.htm
         """
         headers = {"User-Agent": "Mozilla/5.0"}
-        r = requests.get(self.ROOT_URL, headers=headers)
-        soup = BeautifulSoup(r.text, "html.parser")
+        r = http_client.get(self.ROOT_URL, headers=headers)
+        soup = make_soup(r.text)
 
         # 1) datalist autocomplete
         dl = soup.find("datalist", id="lstSymbol")
@@ -88,8 +90,8 @@ class StockQuoteService(CommonService):
 
     def _get_stock_info(self, url: str) -> dict:
         headers = {"User-Agent": "Mozilla/5.0"}
-        r = requests.get(url, headers=headers)
-        soup = BeautifulSoup(r.text, "html.parser")
+        r = http_client.get(url, headers=headers)
+        soup = make_soup(r.text)
 
         # ==== Ví dụ selector, bạn cần inspect lại cho chính xác ====
         price   = soup.select_one("div.box-price span.value").get_text(strip=True)
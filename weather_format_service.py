@@ -1,6 +1,6 @@
 import traceback
-import requests
-from bs4 import BeautifulSoup
+import http_client
+from html_parser import make_soup
 from urllib.parse import quote, urljoin
 import re
 
@@ -8,6 +8,8 @@ from common_service import CommonService  # hoặc from .common_service import C
 
 class WeatherFormatService(CommonService):
     service_name = "weather_format_service"
+    cache_ttl = 600
+    warm_up_urls = ["https://www.accuweather.com"]
 
     # Mapping từ icon_id sang title tiếng Việt
     ICON_TITLES = {
@@ -108,8 +110,8 @@ class WeatherFormatService(CommonService):
         encoded = quote(city)
         search_url = f"https://www.accuweather.com/en/search-locations?query={encoded}"
         headers = {"User-Agent": "Mozilla/5.0"}
-        res = requests.get(search_url, headers=headers)
-        soup = BeautifulSoup(res.text, "html.parser")
+        html = http_client.get_text(search_url, headers=headers)
+        soup = make_soup(html)
 
         results = soup.select_one("div.locations-list.content-module")
         if not results:
@@ -121,7 +123,7 @@ class WeatherFormatService(CommonService):
 
         href = first["href"]
         if href.startswith("/web-api/three-day-redirect"):
-            redirect = requests.get(
+            redirect = http_client.get(
                 urljoin("https://www.accuweather.com", href),
                 headers=headers,
                 allow_redirects=False
@@ -161,8 +163,8 @@ class WeatherFormatService(CommonService):
     @staticmethod
     def parse_accuweather_weather(url):
         headers = {"User-Agent": "Mozilla/5.0"}
-        res = requests.get(url, headers=headers)
-        soup = BeautifulSoup(res.text, "html.parser")
+        html = http_client.get_text(url, headers=headers)
+        soup = make_soup(html)
 
         def safe_text(sel):
             el = soup.select_one(sel)
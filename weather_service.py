@@ -1,6 +1,6 @@
 import traceback
-import requests
-from bs4 import BeautifulSoup
+import http_client
+from html_parser import make_soup
 from urllib.parse import quote
 import re
 from urllib.parse import urljoin
@@ -13,8 +13,8 @@ class AccuweatherScraper:
         encoded_city = quote(city)
         search_url = f"https://www.accuweather.com/en/search-locations?query={encoded_city}"
         headers = {"User-Agent": "Mozilla/5.0"}
-        res = requests.get(search_url, headers=headers)
-        soup = BeautifulSoup(res.text, "html.parser")
+        html = http_client.get_text(search_url, headers=headers)
+        soup = make_soup(html)
 
         # Lấy đúng container kết quả
         results = soup.select_one("div.locations-list.content-module")
@@ -29,7 +29,7 @@ class AccuweatherScraper:
 
         # Nếu là redirect endpoint
         if href.startswith("/web-api/three-day-redirect"):
-            redirect_resp = requests.get(
+            redirect_resp = http_client.get(
                 urljoin("https://www.accuweather.com", href),
                 headers=headers,
                 allow_redirects=False
@@ -68,8 +68,8 @@ class AccuweatherScraper:
     @staticmethod
     def parse_accuweather_weather(url):
         headers = {"User-Agent": "Mozilla/5.0"}
-        res = requests.get(url, headers=headers)
-        soup = BeautifulSoup(res.text, "html.parser")
+        html = http_client.get_text(url, headers=headers)
+        soup = make_soup(html)
 
         def safe(sel):
             e = soup.select_one(sel)
@@ -133,6 +133,8 @@ class AccuweatherScraper:
 
 class WeatherServicePhong(CommonService):
     service_name = "weather_service_phong"
+    cache_ttl = 600
+    warm_up_urls = ["https://www.accuweather.com"]
 
     def __init__(self):
         super().__init__()
@@ -0,0 +1,69 @@
+# wiki_article_cache.py
+# Cache bài Wikipedia đã xử lý theo (pageid, revid): bài chưa có revision mới thì không phải tải/parse lại.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class WikiArticleCache:
+    """
+    Lưu extract, HTML đã làm sạch, đoạn văn đầu... của từng bài trên SQLite.
+    Mỗi pageid chỉ giữ bản của revision mới nhất đã thấy, revid khác nghĩa là bài đã được sửa.
+    """
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            "pageid INTEGER PRIMARY KEY, revid INTEGER NOT NULL, title TEXT NOT NULL, "
+            "data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "stores": 0}
+
+    def get(self, pageid, revid):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT revid, data FROM articles WHERE pageid = ?", (pageid,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            if revid is None or row[0] != revid:
+                self._stats["stale"] += 1
+                return None
+            self._stats["hits"] += 1
+            return json.loads(row[1])
+
+    def set(self, pageid, revid, title, data):
+        if revid is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles (pageid, revid, title, data, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (pageid, revid, title, json.dumps(data, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+            self._stats["stores"] += 1
+
+    def stats(self):
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            return {**self._stats, "articles": count, "path": self.path}
+
+
+def _default_path():
+    # Mặc định nằm cùng thư mục với response cache, không cấu hình thì chỉ giữ trong bộ nhớ
+    cache_dir = os.getenv("WIKI_ARTICLE_CACHE_DIR") or os.getenv("RESPONSE_CACHE_DIR")
+    if not cache_dir:
+        return ":memory:"
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, "wiki_articles.sqlite3")
+
+
+article_cache = WikiArticleCache(_default_path())
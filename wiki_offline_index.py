@@ -0,0 +1,113 @@
+# wiki_offline_index.py
+# Index Wikipedia offline (build bằng build_wiki_index.py): inverted index BM25 + text bài viết,
+# tất cả được memory-map nên mở index gần như tức thì và chỉ trang nào được đọc mới nằm trong RAM.
+
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+INDEX_VERSION = 1
+TOKEN_RE = re.compile(r"\w+")
+
+# Tên các file trong thư mục index
+META_FILE = "meta.json"
+DOCS_FILE = "docs.json"
+TERMS_FILE = "terms.json"
+OFFSETS_FILE = "doc_offsets.npy"
+LENGTHS_FILE = "doc_lengths.npy"
+POSTING_DOCS_FILE = "posting_docs.npy"
+POSTING_TFS_FILE = "posting_tfs.npy"
+TEXTS_FILE = "texts.bin"
+
+
+def tokenize(text):
+    """Tách từ cho tiếng Việt: chuẩn hoá NFC, chữ thường, mỗi âm tiết là một token."""
+    return TOKEN_RE.findall(unicodedata.normalize("NFC", text or "").lower())
+
+
+class WikiOfflineIndex:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Index version {self.meta.get('version')} không được hỗ trợ, hãy build lại")
+        with open(os.path.join(path, DOCS_FILE), encoding="utf-8") as f:
+            # [pageid, title, revid] theo docid
+            self.docs = json.load(f)
+        with open(os.path.join(path, TERMS_FILE), encoding="utf-8") as f:
+            # term -> [vị trí trong posting, số bài chứa term]
+            self.terms = json.load(f)
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self.lengths = np.load(os.path.join(path, LENGTHS_FILE), mmap_mode="r")
+        self.posting_docs = np.load(os.path.join(path, POSTING_DOCS_FILE), mmap_mode="r")
+        self.posting_tfs = np.load(os.path.join(path, POSTING_TFS_FILE), mmap_mode="r")
+        self.texts = np.memmap(os.path.join(path, TEXTS_FILE), dtype=np.uint8, mode="r")
+        self.k1 = self.meta["k1"]
+        self.b = self.meta["b"]
+        self.avgdl = self.meta["avgdl"] or 1.0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def search(self, query, limit=5):
+        """Trả về [(docid, score)] theo BM25, điểm cao nhất trước."""
+        n = len(self.docs)
+        scores = None
+        for term in set(tokenize(query)):
+            entry = self.terms.get(term)
+            if entry is None:
+                continue
+            start, df = entry
+            docs = self.posting_docs[start:start + df]
+            tfs = self.posting_tfs[start:start + df].astype(np.float32)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[docs] / self.avgdl)
+            if scores is None:
+                scores = np.zeros(n, dtype=np.float32)
+            # Mỗi docid chỉ xuất hiện một lần trong posting của một term nên cộng trực tiếp được
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+        if scores is None:
+            return []
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > limit:
+            top = np.argpartition(scores[candidates], -limit)[-limit:]
+            candidates = candidates[top]
+        ranked = sorted(candidates.tolist(), key=lambda docid: -scores[docid])
+        return [(docid, float(scores[docid])) for docid in ranked]
+
+    def document(self, docid):
+        pageid, title, revid = self.docs[docid]
+        start, first_len, text_len = (int(x) for x in self.offsets[docid])
+        first_paragraph = bytes(self.texts[start:start + first_len]).decode("utf-8")
+        text_start = start + first_len
+        extract = bytes(self.texts[text_start:text_start + text_len]).decode("utf-8")
+        return {
+            "pageid": pageid,
+            "title": title,
+            "revid": revid,
+            "first_paragraph": first_paragraph,
+            "extract": extract
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(path=None):
+    """Mở index (một lần cho cả process), None nếu chưa cấu hình WIKI_OFFLINE_INDEX."""
+    global _index
+    path = path or os.getenv("WIKI_OFFLINE_INDEX")
+    if not path:
+        return None
+    if _index is None or _index.path != path:
+        with _index_lock:
+            if _index is None or _index.path != path:
+                _index = WikiOfflineIndex(path)
+    return _index
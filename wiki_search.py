@@ -1,15 +1,41 @@
+import asyncio
+import os
 import traceback
-import requests
-from bs4 import BeautifulSoup
+import http_client
+from bs4.element import Comment, NavigableString, PreformattedString
+from concurrent.futures import ThreadPoolExecutor
+from html_parser import make_soup
+from html import escape
 from urllib.parse import quote
 
+import async_http
 from common_service import CommonService
+from wiki_article_cache import article_cache
 
 class WikiSearchService(CommonService):
     service_name = "wiki_search_service"
+    cache_ttl = 86400
     
     # Sử dụng Wikipedia tiếng Việt
     WIKI_API_URL = "https://vi.wikipedia.org/w/api.php"
+    ARTICLE_URL = "https://vi.wikipedia.org/wiki/"
+    warm_up_urls = [WIKI_API_URL]
+    MAX_RESULTS = 5
+    SNIPPET_LENGTH = 200
+    # Số request song song tối đa khi lấy HTML/extract của các bài
+    FETCH_CONCURRENCY = int(os.getenv("WIKI_FETCH_CONCURRENCY", 5))
+    # "offline" = trả lời từ index local (WIKI_OFFLINE_INDEX), request có thể ghi đè bằng "mode"
+    SEARCH_MODE = os.getenv("WIKI_SEARCH_MODE", "online")
+    # "output" của request: html (mặc định, html_cleaned) hoặc markdown/text (content gọn)
+    OUTPUT_MODES = ("html", "markdown", "text")
+
+    # Làm sạch HTML: thẻ/class bị bỏ (giữ lại text dưới dạng <p> nếu có) và các thuộc tính giữ lại
+    REMOVE_TAGS = {"script", "style", "nav", "footer", "form", "aside", "noscript", "link"}
+    REMOVE_CLASSES = {"mw-editsection", "reference", "reflist", "navbox", "metadata", "ambox",
+                      "infobox-above", "mw-empty-elt", "noprint", "navbox-styles"}
+    HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+    KEEP_ATTRS = {"a": {"href", "title"}, "img": {"src", "alt"}}
+    DROP_ATTRS = {"class", "style", "id", "typeof", "rel"}
     
     def __init__(self):
         super(WikiSearchService, self).__init__()
@@ -29,9 +55,17 @@ class WikiSearchService(CommonService):
                 })
                 return response
 
+            options, error = self.output_options(json_data)
+            if error:
+                response.update({"message": error, "status": 400})
+                return response
+
+            if self.is_offline(json_data):
+                return self.search_offline(query, response, log, options)
+
             log.debug(f"Searching Wikipedia for: {query}")
 
-            # 1. Search Wikipedia
+            # 1. Search + extract + url trong một request (generator=search)
             search_results = self.search_wikipedia(query)
             if not search_results:
                 response.update({
@@ -40,25 +74,25 @@ class WikiSearchService(CommonService):
                 })
                 return response
 
-            # 2. Get detailed content for all results
-            pageids = [str(item["pageid"]) for item in search_results]
-            titles = {str(item["pageid"]): item["title"] for item in search_results}
-            details = self.get_multiple_wiki_contents(pageids, titles)
-
-            # 3. Merge details into results
-            full_results = []
-            for item in search_results:
-                detail = details.get(str(item["pageid"]), {})
-                merged = {**item, **detail}
-                # Lấy HTML cho từng bài
-                html = self.get_html_content(item["title"])
-                # merged["html"] = html
-                merged["html_cleaned"] = self.clean_html_content(html)
-                # Parse HTML để lấy đoạn văn đầu và bảng
-                parsed = self.parse_html_content(html)
-                merged["first_paragraph"] = parsed["first_paragraph"]
-                # merged["tables"] = parsed["tables"]
-                full_results.append(merged)
+            # 2. Bài nào chưa có revision mới thì lấy luôn từ cache, không tải/parse lại
+            articles = {item["pageid"]: self.get_cached_article(item) for item in search_results}
+            stale = [item for item in search_results if articles[item["pageid"]] is None]
+
+            # 3. HTML từng bài (và extract còn thiếu) lấy đồng thời, giới hạn số request song song
+            missing = [item for item in stale if not item["extract"]]
+            if stale:
+                with ThreadPoolExecutor(max_workers=self.FETCH_CONCURRENCY) as executor:
+                    html_futures = [executor.submit(self.get_html_content, item["title"]) for item in stale]
+                    extract_futures = [(item, executor.submit(self.get_extract, item["title"])) for item in missing]
+                    for item, future in extract_futures:
+                        self.merge_extract(item, future.result())
+                    htmls = [future.result() for future in html_futures]
+
+                # 4. Parse HTML các bài mới/đã sửa và lưu cache
+                for item, html in zip(stale, htmls):
+                    articles[item["pageid"]] = self.load_article(item, html)
+
+            full_results = [self.build_result(item, articles[item["pageid"]], options) for item in search_results]
 
             response.update({
                 "query": query,
@@ -75,182 +109,484 @@ class WikiSearchService(CommonService):
 
         return response
 
-    def search_wikipedia(self, query):
-        params = {
+    async def aprocess(self, json_data, log):
+        """Giống process nhưng gọi API bằng client async, các bài được lấy HTML đồng thời."""
+        response = {
+            "message": "Success",
+            "status": 200
+        }
+
+        try:
+            query = json_data.get("query", "").strip()
+            if not query:
+                response.update({
+                    "message": "Bạn chưa cung cấp từ khóa tìm kiếm.",
+                    "status": 400
+                })
+                return response
+
+            options, error = self.output_options(json_data)
+            if error:
+                response.update({"message": error, "status": 400})
+                return response
+
+            if self.is_offline(json_data):
+                # Tra index là CPU + đọc file, chạy trong thread để không block event loop
+                return await asyncio.to_thread(self.search_offline, query, response, log, options)
+
+            log.debug(f"Searching Wikipedia (async) for: {query}")
+
+            data = await async_http.get_json(self.WIKI_API_URL, params=self.search_params(query))
+            search_results = self.parse_search_results(data)
+            if not search_results:
+                response.update({
+                    "message": f"Không tìm thấy kết quả cho '{query}'.",
+                    "status": 404
+                })
+                return response
+
+            articles = {item["pageid"]: self.get_cached_article(item) for item in search_results}
+            stale = [item for item in search_results if articles[item["pageid"]] is None]
+
+            # HTML từng bài và extract còn thiếu không phụ thuộc nhau -> chạy đồng thời, có giới hạn
+            limit = asyncio.Semaphore(self.FETCH_CONCURRENCY)
+
+            async def bounded(coro):
+                async with limit:
+                    return await coro
+
+            missing = [item for item in stale if not item["extract"]]
+            htmls, extracts = await asyncio.gather(
+                asyncio.gather(*(bounded(self.aget_html_content(item["title"])) for item in stale)),
+                asyncio.gather(*(bounded(self.aget_extract(item["title"])) for item in missing))
+            )
+            for item, page in zip(missing, extracts):
+                self.merge_extract(item, page)
+
+            # Parse HTML tốn CPU, đẩy sang thread để không block event loop
+            loaded = await asyncio.gather(*(
+                asyncio.to_thread(self.load_article, item, html)
+                for item, html in zip(stale, htmls)
+            ))
+            for item, article in zip(stale, loaded):
+                articles[item["pageid"]] = article
+
+            full_results = [self.build_result(item, articles[item["pageid"]], options) for item in search_results]
+
+            response.update({
+                "query": query,
+                "results": full_results,
+                "source": full_results[0].get("url", "") if full_results else ""
+            })
+
+        except Exception as e:
+            log.error(traceback.format_exc())
+            response.update({
+                "message": str(e),
+                "status": 500
+            })
+
+        return response
+
+    def is_offline(self, json_data):
+        return (json_data.get("mode") or self.SEARCH_MODE) == "offline"
+
+    def search_offline(self, query, response, log, options):
+        """Trả lời từ index offline (build_wiki_index.py), cùng dạng response với khi gọi API."""
+        # Import muộn: numpy chỉ cần khi dùng chế độ offline
+        from wiki_offline_index import get_index
+
+        log.debug(f"Searching offline Wikipedia index for: {query}")
+        index = get_index()
+        if index is None:
+            response.update({
+                "message": "Chưa cấu hình index Wikipedia offline (WIKI_OFFLINE_INDEX).",
+                "status": 503
+            })
+            return response
+
+        full_results = []
+        for docid, _ in index.search(query, self.MAX_RESULTS):
+            doc = index.document(docid)
+            paragraphs = [p.strip() for p in doc["extract"].split("\n") if p.strip()]
+            item = {
+                "title": doc["title"],
+                "snippet": self.make_snippet(doc["extract"]),
+                "pageid": doc["pageid"],
+                "url": f"https://en.wikipedia.org/?curid={doc['pageid']}",
+                "extract": doc["extract"],
+                "fullurl": self.ARTICLE_URL + quote(doc["title"].replace(" ", "_")),
+                "revid": doc["revid"]
+            }
+            # Index chỉ có text thuần, HTML/blocks dựng lại từ các đoạn văn
+            article = {
+                "extract": doc["extract"],
+                "fullurl": item["fullurl"],
+                "html_cleaned": "".join(f"<p>{escape(p)}</p>" for p in paragraphs),
+                "first_paragraph": doc["first_paragraph"],
+                "blocks": [{"section": "", "type": "paragraph", "text": p} for p in paragraphs]
+            }
+            full_results.append(self.build_result(item, article, options))
+
+        if not full_results:
+            response.update({
+                "message": f"Không tìm thấy kết quả cho '{query}'.",
+                "status": 404
+            })
+            return response
+
+        response.update({
+            "query": query,
+            "results": full_results,
+            "source": full_results[0].get("url", "")
+        })
+        return response
+
+    def load_article(self, item, html):
+        """Xử lý HTML của bài (một lần parse) và lưu cache theo revision hiện tại."""
+        parsed = self.process_html_content(html)
+        article = {
+            "extract": item["extract"],
+            "fullurl": item["fullurl"],
+            "html_cleaned": parsed["html_cleaned"],
+            "first_paragraph": parsed["first_paragraph"],
+            "tables": parsed["tables"],
+            "blocks": parsed["blocks"]
+        }
+        # Chưa lấy được extract thì để lần sau thử lại thay vì cache bản thiếu
+        if article["extract"]:
+            article_cache.set(item["pageid"], item["revid"], item["title"], article)
+        return article
+
+    @staticmethod
+    def get_cached_article(item):
+        article = article_cache.get(item["pageid"], item["revid"])
+        # Bản cache cũ chưa có blocks thì coi như hết hạn để xử lý lại
+        if article is not None and "blocks" not in article:
+            return None
+        return article
+
+    @classmethod
+    def output_options(cls, json_data):
+        """Đọc output/sections/max_chars, trả về (options, lỗi); lỗi là None nếu hợp lệ."""
+        output = json_data.get("output") or "html"
+        if not isinstance(output, str) or output.lower() not in cls.OUTPUT_MODES:
+            return None, f"output phải là một trong: {', '.join(cls.OUTPUT_MODES)}."
+        sections = json_data.get("sections")
+        if isinstance(sections, str):
+            sections = [name for name in sections.split(",") if name.strip()]
+        elif sections is not None and not (isinstance(sections, list) and all(isinstance(n, str) for n in sections)):
+            return None, "sections phải là danh sách tên mục."
+        max_chars = json_data.get("max_chars")
+        if max_chars in (None, ""):
+            max_chars = None
+        else:
+            try:
+                max_chars = int(max_chars)
+            except (TypeError, ValueError):
+                return None, "max_chars phải là số nguyên."
+            if max_chars < 0:
+                return None, "max_chars không được âm."
+        return {
+            "output": output.lower(),
+            "sections": sections or None,
+            "max_chars": max_chars or None
+        }, None
+
+    @classmethod
+    def build_result(cls, item, article, options=None):
+        merged = {**item, "extract": article["extract"], "fullurl": article["fullurl"] or item["fullurl"]}
+        if not merged["snippet"]:
+            merged["snippet"] = cls.make_snippet(merged["extract"])
+        merged["first_paragraph"] = article["first_paragraph"]
+        output = (options or {}).get("output", "html")
+        if output == "html":
+            # merged["html"] = html
+            merged["html_cleaned"] = article["html_cleaned"]
+            # merged["tables"] = article["tables"]
+            return merged
+        # markdown/text: chỉ trả nội dung đã render (gọn hơn nhiều), bỏ HTML và extract đầy đủ
+        del merged["extract"]
+        merged["content"] = cls.render_article(
+            article["blocks"], output, options.get("sections"), options.get("max_chars")
+        )
+        return merged
+
+    @classmethod
+    def search_params(cls, query):
+        # generator=search trả luôn extract/url của các bài tìm được, không cần gọi thêm
+        return {
             "action": "query",
             "format": "json",
-            "list": "search",
-            "srsearch": query,
-            "srlimit": 5,
-            "srprop": "snippet|title|pageid"
+            "generator": "search",
+            "gsrsearch": query,
+            "gsrlimit": cls.MAX_RESULTS,
+            "prop": "extracts|info",
+            "explaintext": True,
+            "exlimit": "max",
+            "inprop": "url",
+            "redirects": 1
         }
-        response = requests.get(self.WIKI_API_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-        results = []
-        if "query" in data and "search" in data["query"]:
-            for item in data["query"]["search"]:
-                results.append({
-                    "title": item["title"],
-                    "snippet": BeautifulSoup(item["snippet"], "html.parser").get_text(),
-                    "pageid": item["pageid"],
-                    "url": f"https://en.wikipedia.org/?curid={item['pageid']}"
-                })
-        return results
 
-    def get_multiple_wiki_contents(self, pageids, titles=None):
-        # Lấy nội dung chi tiết cho nhiều pageid cùng lúc, có xử lý redirect
+    @staticmethod
+    def contents_params(titles):
         params = {
             "action": "query",
             "format": "json",
-            "pageids": "|".join(pageids),
             "prop": "extracts|info",
             "explaintext": True,
             "inprop": "url",
             "redirects": 1
         }
-        response = requests.get(self.WIKI_API_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-        details = {}
-        missing_titles = []
-        if "query" in data and "pages" in data["query"]:
-            for pid, page in data["query"]["pages"].items():
-                extract = page.get("extract", "")
-                details[pid] = {
-                    "extract": extract,
-                    "fullurl": page.get("fullurl", ""),
-                }
-                if not extract and titles:
-                    missing_titles.append(titles[pid])
-        # Nếu có bài bị thiếu extract, thử lấy lại theo title và có redirect
-        if missing_titles:
-            params = {
-                "action": "query",
-                "format": "json",
-                "titles": "|".join(missing_titles),
-                "prop": "extracts|info",
-                "explaintext": True,
-                "inprop": "url",
-                "redirects": 1
-            }
-            response = requests.get(self.WIKI_API_URL, params=params)
-            response.raise_for_status()
-            data = response.json()
-            if "query" in data and "pages" in data["query"]:
-                for page in data["query"]["pages"].values():
-                    title = page.get("title", "")
-                    extract = page.get("extract", "")
-                    for pid, t in titles.items():
-                        if t == title and not details[pid]["extract"]:
-                            details[pid]["extract"] = extract
-                            details[pid]["fullurl"] = page.get("fullurl", "")
-        return details
+        params["titles"] = "|".join(titles)
+        return params
 
-    def get_html_content(self, title):
-        params = {
+    @staticmethod
+    def html_params(title):
+        return {
             "action": "parse",
             "format": "json",
             "page": title,
             "prop": "text",
             "redirects": 1
         }
-        response = requests.get(self.WIKI_API_URL, params=params)
+
+    def search_wikipedia(self, query):
+        response = http_client.get(self.WIKI_API_URL, params=self.search_params(query))
         response.raise_for_status()
-        data = response.json()
+        return self.parse_search_results(response.json())
+
+    @classmethod
+    def parse_search_results(cls, data):
+        pages = list(data.get("query", {}).get("pages", {}).values())
+        # Kết quả của generator không theo thứ tự, sắp lại theo thứ hạng tìm kiếm
+        pages.sort(key=lambda page: page.get("index", 0))
+        results = []
+        for page in pages:
+            if "missing" in page:
+                continue
+            extract = page.get("extract", "")
+            results.append({
+                "title": page["title"],
+                "snippet": cls.make_snippet(extract),
+                "pageid": page["pageid"],
+                "url": f"https://en.wikipedia.org/?curid={page['pageid']}",
+                "extract": extract,
+                "fullurl": page.get("fullurl", ""),
+                # prop=info trả lastrevid: dùng để biết bài trong cache còn mới hay không
+                "revid": page.get("lastrevid")
+            })
+        return results
+
+    @classmethod
+    def make_snippet(cls, extract):
+        # generator=search không trả snippet, lấy đoạn đầu của extract thay thế
+        text = " ".join(extract.split())
+        if len(text) <= cls.SNIPPET_LENGTH:
+            return text
+        return text[:cls.SNIPPET_LENGTH].rsplit(" ", 1)[0] + "..."
+
+    def get_extract(self, title):
+        # API chỉ trả extract đầy đủ cho một bài mỗi lần, các bài còn thiếu được lấy riêng theo title
+        response = http_client.get(self.WIKI_API_URL, params=self.contents_params([title]))
+        response.raise_for_status()
+        return self.parse_extract(response.json())
+
+    async def aget_extract(self, title):
+        data = await async_http.get_json(self.WIKI_API_URL, params=self.contents_params([title]))
+        return self.parse_extract(data)
+
+    @staticmethod
+    def parse_extract(data):
+        for page in data.get("query", {}).get("pages", {}).values():
+            if page.get("extract"):
+                return page
+        return None
+
+    @classmethod
+    def merge_extract(cls, item, page):
+        if not page:
+            return
+        item["extract"] = page.get("extract", "")
+        item["fullurl"] = page.get("fullurl", "") or item["fullurl"]
+        if not item["snippet"]:
+            item["snippet"] = cls.make_snippet(item["extract"])
+
+    def get_html_content(self, title):
+        response = http_client.get(self.WIKI_API_URL, params=self.html_params(title))
+        response.raise_for_status()
+        return self.parse_html_response(response.json())
+
+    async def aget_html_content(self, title):
+        data = await async_http.get_json(self.WIKI_API_URL, params=self.html_params(title))
+        return self.parse_html_response(data)
+
+    @staticmethod
+    def parse_html_response(data):
         html = ""
         if "parse" in data and "text" in data["parse"]:
             html = data["parse"]["text"]["*"]
         return html
 
-    def parse_html_content(self, html):
-        soup = BeautifulSoup(html, "html.parser")
-        # Lấy đoạn văn đầu tiên (không nằm trong infobox)
-        first_paragraph = ""
-        for p in soup.select(".mw-parser-output > p"):
-            text = p.get_text(strip=True)
-            if text:
-                first_paragraph = text
-                break
+    def process_html_content(self, html):
+        """
+        Parse HTML của bài một lần và duyệt cây một lượt, trả về cùng lúc:
+        html_cleaned, first_paragraph (đoạn văn đầu), tables (HTML gốc của các bảng) và blocks
+        (nội dung dạng text theo từng khối/mục, dùng cho output markdown/text).
+        """
+        result = {"html_cleaned": "", "first_paragraph": "", "tables": [], "blocks": []}
+        soup = make_soup(html)
+        main_content = soup.select_one(".mw-parser-output")
+        if not main_content:
+            return result
+        # Text của các phần bị thay bằng <p> (chú thích, nút sửa...) không đưa vào blocks
+        result["skip"] = set()
+        self._clean_node(soup, main_content, result)
+        del result["skip"]
+        result["html_cleaned"] = str(main_content)
+        return result
 
-        # Lấy tất cả các bảng (dưới dạng HTML)
-        tables = []
-        for table in soup.select(".mw-parser-output > table"):
-            tables.append(str(table))
+    def _clean_node(self, soup, tag, result, top_level=True):
+        """Làm sạch cây con của `tag` (duyệt sau), trả về True nếu bên trong còn text."""
+        has_text = False
+        for child in list(tag.children):
+            if isinstance(child, Comment):
+                child.extract()
+                continue
+            if isinstance(child, NavigableString):
+                if not isinstance(child, PreformattedString) and child.strip():
+                    has_text = True
+                continue
 
-        return {
-            "first_paragraph": first_paragraph,
-            "tables": tables
-        }
+            if top_level:
+                # Đoạn văn đầu và các bảng lấy từ HTML gốc, trước khi bị làm sạch
+                if child.name == "p" and not result["first_paragraph"]:
+                    result["first_paragraph"] = child.get_text(strip=True)
+                elif child.name == "table":
+                    result["tables"].append(str(child))
 
-    def clean_html_content(self, html):
-        soup = BeautifulSoup(html, "html.parser")
-        main_content = soup.select_one(".mw-parser-output")
-        if not main_content:
-            return ""
-
-        # Remove unnecessary elements but preserve content
-        for tag in main_content.find_all(["script", "style", "nav", "footer", "form", "aside", "noscript", "link"]):
-            # If the tag contains important text, extract it before removing
-            if tag.get_text(strip=True):
-                new_tag = soup.new_tag("p")
-                new_tag.string = tag.get_text(strip=True)
-                tag.replace_with(new_tag)
-            else:
-                tag.decompose()
-
-        # Remove elements with specific classes but preserve their content
-        for cls in ["mw-editsection", "reference", "reflist", "navbox", "metadata", "ambox", 
-                   "infobox-above", "mw-empty-elt", "noprint", "navbox-styles"]:
-            for el in main_content.select(f'.{cls}'):
-                # Preserve text content if it exists
-                if el.get_text(strip=True):
+            if child.name in self.REMOVE_TAGS or self.REMOVE_CLASSES.intersection(child.get("class") or []):
+                text = child.get_text(strip=True)
+                if text:
                     new_tag = soup.new_tag("p")
-                    new_tag.string = el.get_text(strip=True)
-                    el.replace_with(new_tag)
+                    new_tag.string = text
+                    child.replace_with(new_tag)
+                    result["skip"].add(id(new_tag.string))
+                    has_text = True
                 else:
-                    el.decompose()
+                    child.decompose()
+                continue
+
+            if child.name not in self.HEADING_TAGS:
+                self._clean_attrs(child)
+
+            # Phần tử không còn text nào bên trong thì bỏ (kể cả list rỗng)
+            if self._clean_node(soup, child, result, top_level=False):
+                has_text = True
+                if top_level:
+                    self._add_block(child, result["blocks"], result["skip"])
+            else:
+                child.decompose()
+        return has_text
 
-        # Remove comments
-        for comment in main_content.find_all(text=lambda text: isinstance(text, str) and text.strip().startswith('<!--')):
-            comment.extract()
+    @staticmethod
+    def _text(tag, skip):
+        return " ".join("".join(text for text in tag.strings if id(text) not in skip).split())
 
-        # Clean up remaining elements while preserving structure
-        for tag in main_content.find_all():
-            # Keep important attributes for structure
-            if tag.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                # Preserve heading levels
+    def _add_block(self, tag, blocks, skip):
+        """Chuyển một khối cấp cao nhất (đã làm sạch) thành block text, gắn với mục (h2) đang đứng."""
+        section = blocks[-1]["section"] if blocks else ""
+        heading = tag if tag.name in self.HEADING_TAGS else None
+        if heading is None and tag.name == "div":
+            # Wikipedia bọc tiêu đề mục trong <div class="mw-heading"><h2>...</h2></div>
+            heading = tag.find(list(self.HEADING_TAGS))
+            if heading is not None and self._text(heading, skip) != self._text(tag, skip):
+                heading = None
+        if heading is not None:
+            level = int(heading.name[1])
+            text = self._text(heading, skip)
+            if level <= 2:
+                section = text
+            blocks.append({"section": section, "type": "heading", "level": level, "text": text})
+        elif tag.name in ("ul", "ol"):
+            items = [self._text(li, skip) for li in tag.find_all("li", recursive=False)]
+            blocks.append({"section": section, "type": tag.name, "items": [i for i in items if i]})
+        elif tag.name == "table":
+            rows = []
+            for tr in tag.find_all("tr"):
+                cells = [self._text(cell, skip) for cell in tr.find_all(["th", "td"], recursive=False)]
+                if any(cells):
+                    rows.append(cells)
+            blocks.append({"section": section, "type": "table", "rows": rows})
+        else:
+            text = self._text(tag, skip)
+            if text:
+                blocks.append({"section": section, "type": "paragraph", "text": text})
+
+    @staticmethod
+    def render_block(block, output):
+        kind = block["type"]
+        if kind == "heading":
+            return ("#" * block["level"] + " " + block["text"]) if output == "markdown" else block["text"]
+        if kind in ("ul", "ol"):
+            return "\n".join(
+                (f"{i}. " if kind == "ol" else "- ") + item
+                for i, item in enumerate(block["items"], 1)
+            )
+        if kind == "table":
+            if output != "markdown":
+                return "\n".join(" | ".join(row) for row in block["rows"])
+            lines = [f"| {' | '.join(row)} |" for row in block["rows"]]
+            if lines:
+                lines.insert(1, "|" + " --- |" * len(block["rows"][0]))
+            return "\n".join(lines)
+        return block["text"]
+
+    @classmethod
+    def render_article(cls, blocks, output="markdown", sections=None, max_chars=None):
+        """
+        Ghép các block thành markdown/text. `sections`: chỉ lấy các mục có tên trong danh sách
+        ("" hoặc "lead" = phần mở đầu), `max_chars`: cắt khi vượt quá số ký tự.
+        """
+        wanted = None
+        if sections:
+            wanted = {"" if name.strip().lower() == "lead" else name.strip().lower() for name in sections}
+        separator = "\n\n" if output == "markdown" else "\n"
+        parts = []
+        size = 0
+        for block in blocks:
+            if wanted is not None and block["section"].lower() not in wanted:
+                continue
+            text = cls.render_block(block, output)
+            if not text:
                 continue
-            elif tag.name == 'a':
-                # Keep href and title for links
-                attrs = dict(tag.attrs)
-                for attr in attrs:
-                    if attr not in ['href', 'title']:
-                        del tag.attrs[attr]
-            elif tag.name == 'img':
-                # Keep src and alt for images
-                attrs = dict(tag.attrs)
-                for attr in attrs:
-                    if attr not in ['src', 'alt']:
-                        del tag.attrs[attr]
+            if max_chars and size + len(text) > max_chars:
+                remaining = max_chars - size
+                # Cắt khối cuối theo ranh giới từ, tiêu đề thì bỏ hẳn
+                if remaining > 0 and block["type"] != "heading":
+                    cut = text[:remaining].rsplit(" ", 1)[0]
+                    parts.append(cut + "…")
+                break
+            parts.append(text)
+            size += len(text) + len(separator)
+        return separator.join(parts)
+
+    def _clean_attrs(self, tag):
+        keep = self.KEEP_ATTRS.get(tag.name)
+        for attr in list(tag.attrs):
+            if keep is not None:
+                remove = attr not in keep
             else:
-                # Remove unnecessary attributes but keep content
-                for attr in ['class', 'style', 'id', 'data-*', 'typeof', 'rel']:
-                    if attr in tag.attrs:
-                        del tag.attrs[attr]
-
-        # Remove truly empty elements (no text and no children)
-        for tag in main_content.find_all():
-            if not tag.get_text(strip=True) and not tag.find_all():
-                tag.decompose()
-
-        # Preserve list structure
-        for ul in main_content.find_all('ul'):
-            if not ul.get_text(strip=True):
-                ul.decompose()
-
-        for ol in main_content.find_all('ol'):
-            if not ol.get_text(strip=True):
-                ol.decompose()
-
-        return str(main_content)
+                remove = attr in self.DROP_ATTRS or attr.startswith("data-")
+            if remove:
+                del tag.attrs[attr]
+
+    def parse_html_content(self, html):
+        parsed = self.process_html_content(html)
+        return {
+            "first_paragraph": parsed["first_paragraph"],
+            "tables": parsed["tables"]
+        }
+
+    def clean_html_content(self, html):
+        return self.process_html_content(html)["html_cleaned"]